@@ -1,12 +1,37 @@
+import argparse
+import json
 import os
 import shutil
 import subprocess
+import time
 from typing import Dict, List, Optional
 
-from test_case import TestCase
+from test_case import Key, TestCase
 
 KEY_LENGTH = 16
 
+# Key length used when measuring throughput as a function of the number
+# of parallel sessions.
+SESSIONS_KEY_LENGTH = 256
+
+# Link fidelities and key lengths measured in benchmark mode.
+BENCHMARK_FIDELITIES = [1.0, 0.95, 0.9]
+BENCHMARK_KEY_LENGTHS = [64, 256]
+
+# Benchmark results are compared against a baseline file, which is only
+# compared against when it has the current version.
+BENCHMARK_BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "benchmark_baseline.json",
+)
+BENCHMARK_BASELINE_VERSION = 1
+
+# The relative regressions of key generation efficiency and throughput
+# that are tolerated in benchmark mode. Throughput depends on the load of
+# the machine, so it is given more leeway.
+EFFICIENCY_TOLERANCE = 0.1
+THROUGHPUT_TOLERANCE = 0.3
+
 class BasicProtocolsTestCase(TestCase):
 
     def __init__(self, key_length):
@@ -21,8 +46,8 @@ class BasicProtocolsTestCase(TestCase):
 
     def _verify_test_case(
             self,
-            alice_secret_key: Optional[List[int]],
-            bob_secret_key: Optional[List[int]]
+            alice_secret_key: Optional[Key],
+            bob_secret_key: Optional[Key]
     ) -> TestCase.Result:
 
         if alice_secret_key is None:
@@ -39,8 +64,9 @@ class BasicProtocolsTestCase(TestCase):
 
 class CascadeProtocolTestCase(TestCase):
 
-    def __init__(self, key_length):
+    def __init__(self, key_length, fidelity=0.9):
         super().__init__("Cascade Protocol", key_length)
+        self.fidelity = fidelity
 
     def _configure_test_case(self, experiment: Dict) -> None:
         # Configuring for eavesdropping, if present in configuration.
@@ -63,12 +89,12 @@ class CascadeProtocolTestCase(TestCase):
                         values = parameter["values"]
                         for value in values:
                             if value["name"] == "fidelity":
-                                value["value"] = 0.9
+                                value["value"] = self.fidelity
 
     def _verify_test_case(
             self,
-            alice_secret_key: Optional[List[int]],
-            bob_secret_key: Optional[List[int]]
+            alice_secret_key: Optional[Key],
+            bob_secret_key: Optional[Key]
     ) -> TestCase.Result:
 
         if self.eavesdrop:
@@ -91,6 +117,31 @@ class CascadeProtocolTestCase(TestCase):
         return TestCase.Result(success=True, message=None)
 
 
+class ParallelSessionsTestCase(CascadeProtocolTestCase):
+
+    def __init__(self, key_length, num_sessions):
+        super().__init__(key_length)
+        self._name = f"Parallel sessions ({num_sessions})"
+        self.num_sessions = num_sessions
+
+    def _configure_test_case(self, experiment: Dict) -> None:
+        super()._configure_test_case(experiment)
+        self._configure_application_value(experiment, "num_sessions", self.num_sessions)
+
+
+class BenchmarkTestCase(CascadeProtocolTestCase):
+
+    def __init__(self, key_length, fidelity):
+        super().__init__(key_length, fidelity)
+        self._name = f"Benchmark (key length {key_length}, fidelity {fidelity})"
+
+    def _configure_test_case(self, experiment: Dict) -> None:
+        super()._configure_test_case(experiment)
+        self._configure_application_value(experiment, "eavesdropper", 0)
+        self._configure_application_value(experiment, "compact_keys", 1)
+        self.eavesdrop = False
+
+
 def run(test: TestCase, timeout: int = 60) -> bool:
     test.configure()
 
@@ -114,20 +165,164 @@ experiments = [
     },
 ]
 
-def main():
-    for experiment in experiments:
-        experiment_name = experiment["name"]
+def create_experiment(experiment_name: str) -> None:
+    if os.path.exists(experiment_name):
+        shutil.rmtree(experiment_name)
+
+    result = subprocess.run(
+        ["qne", "experiment", "create", experiment_name, "qkd", "randstad"],
+        stdout=subprocess.DEVNULL,
+    )
+    if result.returncode != 0:
+        raise RuntimeError("Experiment creation failed")
+
+
+def sweep_sessions(session_counts: List[int]) -> bool:
+    """
+    Measures the secret key throughput of a single link as a function of
+    the number of parallel sessions.
+    """
+    success = True
+
+    for num_sessions in session_counts:
+        experiment_name = f"sessions-experiment-{num_sessions}"
+        create_experiment(experiment_name)
+        os.chdir(experiment_name)
+
+        start_time = time.perf_counter()
+        test_success = run(ParallelSessionsTestCase(SESSIONS_KEY_LENGTH, num_sessions))
+        elapsed_time = time.perf_counter() - start_time
+
+        os.chdir("..")
+
+        print(
+            f"{num_sessions} sessions :: {elapsed_time:.1f} s :: "
+            f"{SESSIONS_KEY_LENGTH / elapsed_time:.1f} secret bits/s"
+        )
+        success = success and test_success
+
+    return success
+
+
+def run_benchmark(key_length: int, fidelity: float) -> Optional[Dict]:
+    """
+    Runs an experiment without eavesdropper and returns the secret bits per
+    EPR pair, the secret bits per second of wall time and the number of
+    parity bits leaked during information reconciliation, or None if no
+    secret key was established.
+    """
+    experiment_name = f"benchmark-experiment-{key_length}-{fidelity}"
+    create_experiment(experiment_name)
+    os.chdir(experiment_name)
+
+    test = BenchmarkTestCase(key_length, fidelity)
+    start_time = time.perf_counter()
+    success = run(test)
+    elapsed_time = time.perf_counter() - start_time
+
+    os.chdir("..")
+
+    if not success or test.epr_pairs == 0:
+        return None
+
+    return {
+        "key_length": key_length,
+        "fidelity": fidelity,
+        "secret_bits_per_epr_pair": key_length / test.epr_pairs,
+        "secret_bits_per_second": key_length / elapsed_time,
+        "leaked_bits": test.app_results["app_alice"]["leaked_bits"],
+    }
+
+
+def compare_with_baseline(results: List[Dict], baseline: Dict) -> bool:
+    """
+    Compares benchmark results with the baseline results for the same key
+    length and fidelity, failing when the efficiency or throughput regressed
+    beyond the tolerance, or when the baseline has no result to compare with.
+    """
+    baseline_results = {
+        (result["key_length"], result["fidelity"]): result
+        for result in baseline["results"]
+    }
+    success = True
+
+    for result in results:
+        baseline_result = baseline_results.get((result["key_length"], result["fidelity"]))
+        if baseline_result is None:
+            print(
+                f"Key length {result['key_length']}, fidelity {result['fidelity']} :: "
+                f"no baseline result, run with --update-baseline to record one"
+            )
+            success = False
+            continue
+
+        for metric, tolerance in [
+            ("secret_bits_per_epr_pair", EFFICIENCY_TOLERANCE),
+            ("secret_bits_per_second", THROUGHPUT_TOLERANCE),
+        ]:
+            if result[metric] < baseline_result[metric] * (1 - tolerance):
+                print(
+                    f"Key length {result['key_length']}, fidelity {result['fidelity']} :: "
+                    f"REGRESSION :: {metric} dropped from {baseline_result[metric]:.4f} "
+                    f"to {result[metric]:.4f}"
+                )
+                success = False
+
+    return success
+
+
+def benchmark(update_baseline: bool) -> bool:
+    """
+    Measures key generation efficiency, throughput and leakage as a function
+    of link fidelity and key length, and compares them with the baseline.
+    """
+    results = []
+    success = True
 
-        if os.path.exists(experiment_name):
-            shutil.rmtree(experiment_name)
+    for fidelity in BENCHMARK_FIDELITIES:
+        for key_length in BENCHMARK_KEY_LENGTHS:
+            result = run_benchmark(key_length, fidelity)
+            if result is None:
+                success = False
+                continue
 
-        result = subprocess.run(
-            ["qne", "experiment", "create", experiment_name, "qkd", "randstad"],
-            stdout=subprocess.DEVNULL,
+            print(
+                f"Key length {key_length}, fidelity {fidelity} :: "
+                f"{result['secret_bits_per_epr_pair']:.4f} secret bits/EPR pair :: "
+                f"{result['secret_bits_per_second']:.1f} secret bits/s :: "
+                f"{result['leaked_bits']} leaked bits"
+            )
+            results.append(result)
+
+    if update_baseline:
+        with open(BENCHMARK_BASELINE_PATH, "w") as f:
+            json.dump({"version": BENCHMARK_BASELINE_VERSION, "results": results}, f, indent=2)
+        return success
+
+    # Without a baseline, regressions cannot be detected, so the benchmark
+    # fails until one is recorded.
+    if not os.path.exists(BENCHMARK_BASELINE_PATH):
+        print("No benchmark baseline found, run with --update-baseline to record one")
+        return False
+
+    with open(BENCHMARK_BASELINE_PATH, "r") as f:
+        baseline = json.load(f)
+
+    if baseline.get("version") != BENCHMARK_BASELINE_VERSION:
+        print(
+            f"Benchmark baseline has version {baseline.get('version')} instead of "
+            f"{BENCHMARK_BASELINE_VERSION}, run with --update-baseline to record a new one"
         )
-        if result.returncode != 0:
-            raise RuntimeError("Experiment creation failed")
+        return False
+
+    return compare_with_baseline(results, baseline) and success
+
+
+def main():
+    for experiment in experiments:
+        experiment_name = experiment["name"]
 
+        create_experiment(experiment_name)
         os.chdir(experiment_name)
 
         success = run(experiment["test_case"](KEY_LENGTH))
@@ -138,5 +333,29 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sweep-sessions",
+        type=lambda s: [int(n) for n in s.split(",")],
+        help="comma separated numbers of parallel sessions to measure throughput for",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="measure efficiency and throughput and compare them with the baseline",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="record the benchmark results as the new baseline",
+    )
+    args = parser.parse_args()
+
+    if args.benchmark or args.update_baseline:
+        success = benchmark(args.update_baseline)
+    elif args.sweep_sessions:
+        success = sweep_sessions(args.sweep_sessions)
+    else:
+        success = main()
+
     exit(0 if success else 1)
@@ -0,0 +1,124 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "qkd", "src"))
+
+import cascade
+import winnow
+
+QBERS = [0.01, 0.02, 0.03, 0.05, 0.07, 0.09, 0.11]
+
+class CountingParityChannel:
+    """
+    Answers Cascade's block parity questions from the correct key, counting
+    the round trips and the parity bits disclosed. All questions asked at
+    once take a single round trip.
+    """
+
+    def __init__(self, correct_key):
+        self.correct_key = correct_key
+        self.round_trips = 0
+        self.leaked_bits = 0
+
+    def __call__(self, block_indices):
+        return self.ask_parities([block_indices])[0]
+
+    def ask_parities(self, blocks):
+        self.round_trips += 1
+        self.leaked_bits += len(blocks)
+        return [
+            cascade.get_block_parity_from_indices(self.correct_key, block_indices)
+            for block_indices in blocks
+        ]
+
+class CountingWinnowResponder(winnow.WinnowResponder):
+    """
+    Answers Winnow's questions from the correct key, counting the round
+    trips.
+    """
+
+    def __init__(self, correct_key):
+        super().__init__(correct_key)
+        self.round_trips = 0
+
+    def block_parities(self, seed, block_size):
+        self.round_trips += 1
+        return super().block_parities(seed, block_size)
+
+    def syndromes(self, block_ids):
+        self.round_trips += 1
+        return super().syndromes(block_ids)
+
+def reconcile_with_cascade(correct_key, noisy_key, qber):
+    channel = CountingParityChannel(correct_key)
+    corrected_key = cascade.client_cascade(noisy_key, qber, channel)
+    return corrected_key, channel.round_trips, channel.leaked_bits
+
+def reconcile_with_winnow(correct_key, noisy_key, qber):
+    responder = CountingWinnowResponder(correct_key)
+    corrected_key = winnow.client_winnow(
+        noisy_key,
+        qber,
+        responder.block_parities,
+        responder.syndromes,
+    )
+    return corrected_key, responder.round_trips, responder.leaked_bits
+
+def compare(key_length, qbers, num_runs):
+    """
+    Prints the average number of round trips, the number of leaked bits,
+    the wall time and the number of residual errors of Cascade and Winnow
+    for keys with each of the given error rates.
+    """
+    rng = np.random.default_rng()
+    algorithms = [("Cascade", reconcile_with_cascade), ("Winnow", reconcile_with_winnow)]
+
+    print(f"Key length {key_length}, {num_runs} runs per QBER")
+    print(f"{'QBER':>6} {'Algorithm':>10} {'Round trips':>12} {'Leaked bits':>12} {'Time (s)':>10} {'Residual errors':>16}")
+
+    for qber in qbers:
+        for name, reconcile in algorithms:
+            round_trips, leaked_bits, elapsed_time, residual_errors = 0, 0, 0.0, 0
+
+            for _ in range(num_runs):
+                correct_key = rng.integers(2, size=key_length)
+                noisy_key = correct_key ^ (rng.random(key_length) < qber)
+
+                start_time = time.perf_counter()
+                corrected_key, run_round_trips, run_leaked_bits = reconcile(
+                    correct_key,
+                    noisy_key,
+                    qber,
+                )
+                elapsed_time += time.perf_counter() - start_time
+
+                round_trips += run_round_trips
+                leaked_bits += run_leaked_bits
+                residual_errors += int(np.count_nonzero(corrected_key != correct_key))
+
+            print(
+                f"{qber:>6.2f} {name:>10} {round_trips / num_runs:>12.1f} "
+                f"{leaked_bits / num_runs:>12.1f} {elapsed_time / num_runs:>10.4f} "
+                f"{residual_errors / num_runs:>16.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compares Cascade and Winnow information reconciliation.",
+    )
+    parser.add_argument("--key-length", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--qbers",
+        type=lambda s: [float(q) for q in s.split(",")],
+        default=QBERS,
+        help="comma separated quantum bit error rates",
+    )
+    args = parser.parse_args()
+
+    compare(args.key_length, args.qbers, args.runs)
@@ -0,0 +1,37 @@
+import runner
+
+def main(
+        app_config=None,
+        eavesdropper=False,
+        key_length=16,
+        num_keys=1,
+        cascade_workers=1,
+        qber_mode=0,
+        z_basis_probability=0.5,
+        multi_party=0,
+        num_sessions=1,
+        reconciliation_mode=0,
+        window_size=0,
+        compact_keys=0,
+        profile=0,
+):
+    return runner.run_node(
+        "charlie",
+        app_config,
+        eavesdropper=eavesdropper,
+        key_length=key_length,
+        num_keys=num_keys,
+        cascade_workers=cascade_workers,
+        qber_mode=qber_mode,
+        z_basis_probability=z_basis_probability,
+        multi_party=multi_party,
+        num_sessions=num_sessions,
+        reconciliation_mode=reconciliation_mode,
+        window_size=window_size,
+        compact_keys=compact_keys,
+        profile=profile,
+    )
+
+
+if __name__ == "__main__":
+    main()
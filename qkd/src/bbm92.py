@@ -0,0 +1,515 @@
+from parity_channel import ParityChannel
+
+import cascade
+import key_confirmation
+import profiling
+import qber_estimation
+import util
+import winnow
+
+# Information reconciliation algorithms. Cascade asks the parities of
+# single blocks, while Winnow exchanges the parities and Hamming syndromes
+# of all blocks of a pass at once, which takes two round trips per pass.
+CASCADE_RECONCILIATION = 0
+WINNOW_RECONCILIATION = 1
+
+def measure_key_material_on_sockets(
+        conn,
+        epr_sockets,
+        num_epr_pairs,
+        create_epr=True,
+        z_basis_probability=0.5,
+):
+    """
+    Runs the quantum stage of BBM92 for several sessions at the same time,
+    one for each EPR socket.
+
+    Returns a list containing the integer measurements and the measurement
+    bases for each EPR socket.
+    """
+    results = util.measure_epr_in_random_bases_on_sockets(
+        conn,
+        epr_sockets,
+        num_epr_pairs,
+        create_epr=create_epr,
+        z_basis_probability=z_basis_probability,
+    )
+
+    # Converting measurements into integers.
+    return [
+        ([int(x) for x in measurements], measurement_bases)
+        for measurements, measurement_bases in results
+    ]
+
+def _sift(socket, measurements, measurement_bases):
+    """
+    Exchanges measurement bases and returns the raw key, which consists of
+    all bits where the chosen measurement bases were the same for both
+    parties, along with the measurement basis of each raw key bit.
+    """
+
+    # Publishing measurement bases.
+    util.publish_measurement_bases(measurement_bases, socket)
+
+    # Receiving measurement bases from the other side.
+    received_measurement_bases = util.receive_measurement_bases(socket)
+
+    raw_key = util.derive_raw_key(
+            measurement_bases,
+            received_measurement_bases,
+            measurements,
+    )
+    raw_key_bases = util.derive_raw_key_bases(
+        measurement_bases,
+        received_measurement_bases,
+    )
+
+    return raw_key, raw_key_bases
+
+def _select_sample(raw_key, raw_key_bases, key_length, qber_estimation_mode, z_basis_probability):
+    """
+    Selects a random subset of the raw key to disclose for QBER estimation.
+
+    Returns the indices and values of the subset.
+    """
+    if qber_estimation_mode != qber_estimation.SAMPLED:
+        # In full disclosure mode, all bits beyond the key length are disclosed.
+        return util.get_random_raw_key_subset(raw_key, key_length)
+
+    sample_size = qber_estimation.sample_size()
+
+    if z_basis_probability == 0.5:
+        return util.get_random_raw_key_subset(
+            raw_key,
+            key_length,
+            subset_size=min(sample_size, len(raw_key) - key_length),
+        )
+
+    # With biased bases, a random sample would contain hardly any bits of
+    # the rarely chosen basis, so each basis is sampled separately. The
+    # rarely chosen basis is sampled first, so that its sample is as large
+    # as possible.
+    return util.get_stratified_raw_key_subset(
+        raw_key,
+        raw_key_bases,
+        _biased_sample_sizes(raw_key_bases, key_length, qber_estimation_mode, z_basis_probability),
+    )
+
+def _biased_sample_sizes(raw_key_bases, key_length, qber_estimation_mode, z_basis_probability):
+    """
+    Returns the number of bits to disclose in the Z and X basis when the
+    bases are biased. In full disclosure mode, all bits of the rarely chosen
+    basis are disclosed, along with the remaining bits beyond the key length.
+    In sampled mode, a sample of the usual size is disclosed in each basis.
+    """
+    surplus = len(raw_key_bases) - key_length
+    rare_basis = 1 if z_basis_probability > 0.5 else 0
+    rare_basis_count = raw_key_bases.count(rare_basis)
+
+    sample_sizes = [0, 0]
+
+    if qber_estimation_mode == qber_estimation.SAMPLED:
+        sample_size = qber_estimation.sample_size()
+        sample_sizes[rare_basis] = min(sample_size, rare_basis_count, surplus)
+        sample_sizes[1 - rare_basis] = min(sample_size, surplus - sample_sizes[rare_basis])
+    else:
+        sample_sizes[rare_basis] = min(rare_basis_count, surplus)
+        sample_sizes[1 - rare_basis] = surplus - sample_sizes[rare_basis]
+
+    return sample_sizes
+
+def _exceeds_threshold(qber, basis_errors, z_basis_probability):
+    """
+    Determines whether the estimated QBER indicates eavesdropping.
+
+    With biased bases, most of the raw key is measured in the Z basis, so
+    eavesdropping that only shows up in the X basis barely affects the
+    overall QBER. The QBER of each basis is then checked separately, against
+    its upper bound, and too small a sample of either basis is treated as
+    eavesdropping.
+    """
+    if qber >= qber_estimation.QBER_THRESHOLD:
+        return True
+
+    if z_basis_probability != 0.5:
+        return qber_estimation.exceeds_threshold(basis_errors)
+
+    return False
+
+def _has_enough_raw_key(raw_key, key_length, qber_estimation_mode):
+    """
+    Determines whether the raw key is long enough for a key of the given
+    length, along with at least one bit to estimate the QBER unless it is
+    estimated by reconciliation. As both parties sift the same bits, they
+    reach the same decision.
+    """
+    if qber_estimation_mode == qber_estimation.CASCADE:
+        return len(raw_key) >= key_length
+    return len(raw_key) > key_length
+
+def _key_result(secret_key, leaked_bits, qber, qber_upper_bound, basis_errors):
+    return {
+        "secret_key": secret_key,
+        "leaked_bits": leaked_bits,
+        "qber": qber,
+        "qber_upper_bound": qber_upper_bound,
+        "qber_per_basis": [
+            num_errors / num_bits if num_bits > 0 else None
+            for num_errors, num_bits in basis_errors
+        ],
+    }
+
+def _respond_reconciliation(secret_key, socket, num_workers, reconciliation_mode):
+    """
+    Answers Bob's questions until his information reconciliation algorithm
+    has terminated.
+
+    Returns the number of parity bits disclosed.
+    """
+    if reconciliation_mode == WINNOW_RECONCILIATION:
+        return winnow.listen_and_respond_winnow(secret_key, socket)
+
+    if num_workers > 1:
+        # With multiple workers, the questions are tagged with the key
+        # segment they refer to.
+        return cascade.listen_and_respond_segment_parity(secret_key, num_workers, socket)
+
+    return cascade.listen_and_respond_block_parity(secret_key, socket)
+
+def _reconcile(secret_key, qber, socket, num_workers, reconciliation_mode, retry=False):
+    """
+    Corrects Bob's key by asking questions to Alice, and tells her when the
+    information reconciliation algorithm has terminated.
+
+    Cascade's questions are pipelined over a parity channel. With multiple
+    workers, independent segments of the key are reconciled at the same
+    time. When retrying after a failed confirmation, the residual errors are
+    in blocks with even error parity, so Cascade's first pass is run on a
+    reshuffled key.
+
+    Returns the corrected key and the number of parity bits disclosed.
+    """
+    if reconciliation_mode == WINNOW_RECONCILIATION:
+        channel = winnow.WinnowChannel(socket)
+        secret_key = winnow.client_winnow(
+            secret_key,
+            qber,
+            channel.block_parities,
+            channel.syndromes,
+        )
+    elif num_workers > 1 and not retry:
+        channel = ParityChannel(socket)
+        secret_key = cascade.client_cascade_segmented(
+            secret_key,
+            qber,
+            channel,
+            num_workers,
+        )
+    else:
+        channel = ParityChannel(socket)
+        secret_key = cascade.client_cascade(
+            secret_key,
+            qber,
+            channel,
+            shuffle_first_pass=retry,
+        )
+
+    cascade.send_cascade_stop(socket)
+
+    return secret_key, channel.leaked_bits
+
+def alice_post_process(
+        socket,
+        measurements,
+        measurement_bases,
+        key_length,
+        num_workers=1,
+        qber_estimation_mode=qber_estimation.FULL_DISCLOSURE,
+        z_basis_probability=0.5,
+        reconciliation_mode=CASCADE_RECONCILIATION,
+        profiler=None,
+):
+    """
+    Runs Alice's classical stage of BBM92, which consists of sifting,
+    sampling and answering Bob's information reconciliation questions.
+
+    Returns a dictionary containing the secret key, or None if no key could
+    be established, along with the estimated QBER, its upper bound, the
+    QBER estimated separately for the Z and X bases and the number of
+    parity bits disclosed during information reconciliation.
+    """
+    secret_key = None
+    leaked_bits = 0
+
+    qber_estimation_mode = qber_estimation.effective_mode(
+        qber_estimation_mode,
+        z_basis_probability,
+    )
+
+    with profiling.phase(profiler, "sifting"):
+        raw_key, raw_key_bases = _sift(socket, measurements, measurement_bases)
+
+    # Too few pairs were measured in the same basis, so no key is
+    # established.
+    if not _has_enough_raw_key(raw_key, key_length, qber_estimation_mode):
+        return _key_result(None, 0, None, None, [])
+
+    if qber_estimation_mode == qber_estimation.CASCADE:
+        # No bits are disclosed, the QBER is estimated after Cascade.
+        random_bit_indices = []
+        qber = qber_estimation.CASCADE_PRIOR_QBER
+        basis_errors = []
+    else:
+        with profiling.phase(profiler, "qber_estimation"):
+            # Determining a random subset of the raw key to compare.
+            random_bit_indices, random_subset = _select_sample(
+                raw_key,
+                raw_key_bases,
+                key_length,
+                qber_estimation_mode,
+                z_basis_probability,
+            )
+
+            # Sending random subset indices and values.
+            util.publish_subset_indices(random_bit_indices, socket)
+            util.publish_subset_values(random_subset, socket)
+
+            # Receiving remote subset for comparison.
+            remote_subset = util.receive_subset_values(socket)
+
+            # Determining the quantum bit error rate, both overall and
+            # separately for each measurement basis. If it is above the
+            # threshold, do not return a key as this indicates
+            # eavesdropping. Otherwise, go through the Cascade
+            # information reconciliation algorithm.
+            qber = cascade.quantum_bit_error_rate(
+                random_subset,
+                remote_subset,
+            )
+            basis_errors = qber_estimation.estimate_qber_per_basis(
+                random_subset,
+                remote_subset,
+                [raw_key_bases[i] for i in random_bit_indices],
+            )
+            qber_upper_bound = qber_estimation.qber_upper_bound(
+                sum(num_errors for num_errors, _ in basis_errors),
+                len(random_subset),
+            )
+
+    if not _exceeds_threshold(qber, basis_errors, z_basis_probability):
+        secret_key_bits = []
+
+        # Filtering out the bits sent for comparison.
+        secret_key_bits = util.filter_comparison_bits(
+            raw_key,
+            random_bit_indices,
+        )[:key_length]
+        secret_key_bases = util.filter_comparison_bits(
+            raw_key_bases,
+            random_bit_indices,
+        )[:key_length]
+
+        if len(secret_key_bits) > 0:
+            secret_key = secret_key_bits
+
+        with profiling.phase(profiler, "reconciliation"):
+            # Answer questions from Bob until the information reconciliation
+            # algorithm has terminated.
+            leaked_bits = _respond_reconciliation(
+                secret_key,
+                socket,
+                num_workers,
+                reconciliation_mode,
+            )
+
+        with profiling.phase(profiler, "confirmation"):
+            # Confirming that Bob's reconciled key equals Alice's key. On a
+            # mismatch, Bob runs additional reconciliation passes before
+            # trying again.
+            confirmed = key_confirmation.respond_key_confirmation(secret_key, socket)
+            attempts = 1
+
+            while not confirmed and attempts < key_confirmation.MAX_CONFIRMATION_ATTEMPTS:
+                leaked_bits += _respond_reconciliation(secret_key, socket, 1, reconciliation_mode)
+                confirmed = key_confirmation.respond_key_confirmation(secret_key, socket)
+                attempts += 1
+
+        # Discarding keys which could not be confirmed.
+        if not confirmed:
+            secret_key = None
+
+        if qber_estimation_mode == qber_estimation.CASCADE:
+            # Receiving the number of errors corrected by Bob in each
+            # measurement basis.
+            basis_num_errors = [int(e) for e in socket.recv().split(",")]
+            basis_errors = [
+                (num_errors, secret_key_bases.count(basis))
+                for basis, num_errors in enumerate(basis_num_errors)
+            ]
+
+            num_errors = sum(basis_num_errors)
+            qber = num_errors / len(secret_key_bits)
+            qber_upper_bound = qber_estimation.qber_upper_bound(
+                num_errors,
+                len(secret_key_bits),
+            )
+
+            if _exceeds_threshold(qber, basis_errors, z_basis_probability):
+                secret_key = None
+    else:
+        secret_key = None
+
+    return _key_result(secret_key, leaked_bits, qber, qber_upper_bound, basis_errors)
+
+def bob_post_process(
+        socket,
+        measurements,
+        measurement_bases,
+        key_length,
+        num_workers=1,
+        qber_estimation_mode=qber_estimation.FULL_DISCLOSURE,
+        z_basis_probability=0.5,
+        reconciliation_mode=CASCADE_RECONCILIATION,
+        profiler=None,
+):
+    """
+    Runs Bob's classical stage of BBM92, which consists of sifting,
+    sampling and correcting his key with Cascade or Winnow.
+
+    Returns a dictionary containing the secret key, or None if no key could
+    be established, along with the estimated QBER, its upper bound, the
+    QBER estimated separately for the Z and X bases and the number of
+    parity bits disclosed during information reconciliation.
+    """
+    secret_key = None
+    leaked_bits = 0
+
+    qber_estimation_mode = qber_estimation.effective_mode(
+        qber_estimation_mode,
+        z_basis_probability,
+    )
+
+    with profiling.phase(profiler, "sifting"):
+        raw_key, raw_key_bases = _sift(socket, measurements, measurement_bases)
+
+    # Too few pairs were measured in the same basis, so no key is
+    # established.
+    if not _has_enough_raw_key(raw_key, key_length, qber_estimation_mode):
+        return _key_result(None, 0, None, None, [])
+
+    if qber_estimation_mode == qber_estimation.CASCADE:
+        # No bits are disclosed, the QBER is estimated after Cascade.
+        random_bit_indices = []
+        qber = qber_estimation.CASCADE_PRIOR_QBER
+        basis_errors = []
+    else:
+        with profiling.phase(profiler, "qber_estimation"):
+            # Receiving the indices of a random subset of the raw key.
+            random_bit_indices = util.receive_subset_indices(socket)
+            remote_random_subset = util.receive_subset_values(socket)
+
+            # Determining the local random subset corresponding to indices.
+            local_random_subset = [
+                raw_key[int(i)] for i in random_bit_indices
+            ]
+
+            # Sending local random subset for comparison.
+            util.publish_subset_values(local_random_subset, socket)
+
+            # Determining the quantum bit error rate, both overall and
+            # separately for each measurement basis. If it is above the
+            # threshold, do not return a key as this indicates
+            # eavesdropping. Otherwise, go through the Cascade
+            # information reconciliation algorithm.
+            qber = cascade.quantum_bit_error_rate(
+                local_random_subset,
+                remote_random_subset,
+            )
+            basis_errors = qber_estimation.estimate_qber_per_basis(
+                local_random_subset,
+                remote_random_subset,
+                [raw_key_bases[int(i)] for i in random_bit_indices],
+            )
+            qber_upper_bound = qber_estimation.qber_upper_bound(
+                sum(num_errors for num_errors, _ in basis_errors),
+                len(local_random_subset),
+            )
+
+    if not _exceeds_threshold(qber, basis_errors, z_basis_probability):
+        secret_key_bits = []
+
+        # Filtering out the bits sent for comparison.
+        secret_key_bits = util.filter_comparison_bits(
+            raw_key,
+            random_bit_indices,
+        )[:key_length]
+        secret_key_bases = util.filter_comparison_bits(
+            raw_key_bases,
+            random_bit_indices,
+        )[:key_length]
+
+        if len(secret_key_bits) > 0:
+            secret_key = secret_key_bits
+
+        with profiling.phase(profiler, "reconciliation"):
+            # Ask questions to Alice until the information reconciliation
+            # algorithm has terminated.
+            secret_key, leaked_bits = _reconcile(
+                secret_key,
+                qber,
+                socket,
+                num_workers,
+                reconciliation_mode,
+            )
+
+        with profiling.phase(profiler, "confirmation"):
+            # Confirming that the reconciled key equals Alice's key. On a
+            # mismatch, additional reconciliation passes are run.
+            confirmed = key_confirmation.confirm_key(secret_key, socket)
+            attempts = 1
+
+            while not confirmed and attempts < key_confirmation.MAX_CONFIRMATION_ATTEMPTS:
+                secret_key, retry_leaked_bits = _reconcile(
+                    secret_key,
+                    qber,
+                    socket,
+                    num_workers,
+                    reconciliation_mode,
+                    retry=True,
+                )
+                leaked_bits += retry_leaked_bits
+                confirmed = key_confirmation.confirm_key(secret_key, socket)
+                attempts += 1
+
+        if qber_estimation_mode == qber_estimation.CASCADE:
+            # Estimating the QBER in each measurement basis from the
+            # number of bits corrected by reconciliation and sharing the number
+            # of corrected bits with Alice.
+            basis_errors = qber_estimation.estimate_qber_per_basis(
+                secret_key,
+                secret_key_bits,
+                secret_key_bases,
+            )
+            socket.send(",".join([str(num_errors) for num_errors, _ in basis_errors]))
+
+            num_errors = sum(num_errors for num_errors, _ in basis_errors)
+            qber = num_errors / len(secret_key_bits)
+            qber_upper_bound = qber_estimation.qber_upper_bound(
+                num_errors,
+                len(secret_key_bits),
+            )
+
+            if _exceeds_threshold(qber, basis_errors, z_basis_probability):
+                confirmed = False
+
+        # Converting NumPy array representation back into a list representation
+        # to make it compatible with the auto-checking code. Keys which could
+        # not be confirmed are discarded.
+        if confirmed:
+            secret_key = secret_key.tolist()
+        else:
+            secret_key = None
+    else:
+        secret_key = None
+
+    return _key_result(secret_key, leaked_bits, qber, qber_upper_bound, basis_errors)
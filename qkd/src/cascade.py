@@ -1,5 +1,31 @@
+import multiprocessing
+
+from queue import Empty, SimpleQueue
+from threading import Thread, current_thread
+
 import numpy as np
 
+import randomness
+
+from parity_channel import (
+    as_parity_channel,
+    format_parity_answer,
+    parse_parity_question,
+)
+
+# Segments shorter than this are not worth reconciling on a separate worker.
+MIN_SEGMENT_SIZE = 256
+
+# Workers are started from a fork server rather than forked from the
+# calling process, which runs pipeline and session threads that may hold
+# locks at the time of the fork. NumPy is imported by the fork server
+# once, instead of by every worker.
+_WORKER_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+if _WORKER_CONTEXT.get_start_method() == "forkserver":
+    _WORKER_CONTEXT.set_forkserver_preload(["numpy"])
+
 def quantum_bit_error_rate(local_set, remote_set):
     """
     Estimates the quantum bit error rate based on two sets.
@@ -57,98 +83,331 @@ def binary_algorithm(block, block_indices, ask_parity_fn):
 
     return np.concatenate((left_block, right_block))
 
-def client_cascade(noisy_key, qber, ask_parity_fn):
+def batched_binary_algorithm(noisy_key, blocks, parity_channel):
+    """
+    Runs the binary algorithm on many blocks with odd error parity in
+    lockstep, correcting one-bit errors in the noisy key in place.
+
+    The blocks must be disjoint. At every level of the bisection, the
+    parities of the left sub-blocks of all blocks are asked at once, which
+    takes the same number of rounds as a single block.
+    """
+    while blocks:
+        # Correcting blocks of size one, as they must have an odd number
+        # of errors per the input assumptions of the binary algorithm.
+        for block_indices in blocks:
+            if len(block_indices) == 1:
+                noisy_key[block_indices[0]] ^= 1
+
+        blocks = [block_indices for block_indices in blocks if len(block_indices) > 1]
+
+        if not blocks:
+            break
+
+        # The block split index selection ensures that the left
+        # block has one more bit than the right when the block
+        # size is odd.
+        split_blocks = []
+        for block_indices in blocks:
+            block_split_index = (len(block_indices) + 1) // 2
+            split_blocks.append((
+                block_indices[:block_split_index],
+                block_indices[block_split_index:],
+            ))
+
+        # Asking for the correct parities of the left blocks. The
+        # parities of the right blocks can be inferred from them.
+        left_blocks = [left_block_indices for left_block_indices, _ in split_blocks]
+        correct_left_block_parities = parity_channel.ask_parities(left_blocks)
+
+        # Recursing on the sub-blocks with odd error parity.
+        blocks = []
+        for (left_block_indices, right_block_indices), correct_left_block_parity in zip(
+            split_blocks,
+            correct_left_block_parities,
+        ):
+            current_left_block_parity = np.sum(noisy_key[left_block_indices]) % 2
+
+            if current_left_block_parity ^ correct_left_block_parity == 1:
+                blocks.append(left_block_indices)
+            else:
+                blocks.append(right_block_indices)
+
+def client_cascade(noisy_key, qber, ask_parity_fn, shuffle_first_pass=False):
     """
     An implementation of the Cascade information reconciliation algorithm
     used for post-processing of keys exchanged via quantum key distribution.
+
+    The key is not shuffled during the first pass unless shuffle_first_pass
+    is set, which is used to run additional passes on an already reconciled
+    key whose residual errors fall into the same blocks.
+    """
+    return client_cascade_batch(
+        [noisy_key],
+        [qber],
+        ask_parity_fn,
+        shuffle_first_pass=shuffle_first_pass,
+    )[0]
+
+def client_cascade_batch(noisy_keys, qbers, ask_parity_fn, shuffle_first_pass=False):
     """
+    Runs Cascade on many independent keys in lockstep, so that the fixed
+    number of rounds of Cascade is shared by all keys instead of being paid
+    for each key. This pays off when many short keys are reconciled back
+    to back.
 
-    # Representing the noisy key as a NumPy array, if it isn't already.
-    noisy_key = np.array(noisy_key)
+    The keys are treated as consecutive parts of a single key, but blocks
+    are only ever formed and shuffled within a key. Block indices in
+    questions refer to the concatenation of the keys, so that the other
+    side answers them with listen_and_respond_block_parity_batch. All block
+    parities of a pass, and all bisection steps at the same depth, are
+    asked for all keys at once.
+
+    The applications do not call this yet: in continuous mode, each key
+    is still post-processed, and so reconciled, on its own.
+
+    Arguments:
+
+    noisy_keys - A list containing each noisy key.
+    qbers - A list containing the estimated quantum bit error rate of each key.
+    ask_parity_fn - A function or parity channel answering block parity
+        questions.
+    shuffle_first_pass - Determines whether the keys are shuffled during the
+        first pass.
 
-    key_length = len(noisy_key)
+    Returns:
+
+    corrected_keys - A list containing each corrected key as a NumPy array.
+    """
+
+    # Representing the noisy keys as a single NumPy array.
+    noisy_keys = [np.array(noisy_key) for noisy_key in noisy_keys]
+    key_lengths = [len(noisy_key) for noisy_key in noisy_keys]
+    key_starts = np.cumsum([0] + key_lengths)
+    noisy_key = np.concatenate(noisy_keys) if noisy_keys else np.zeros(0, dtype=int)
+
+    # Plain functions answering one question at a time are supported,
+    # but channels can answer many questions at once.
+    parity_channel = as_parity_channel(ask_parity_fn)
 
     # If the estimated quantum bit error rate is 0%, assume that a reasonable
     # amount of errors were present outside of the sampling set.
-    if qber == 0.0:
-        qber = 0.1
+    qbers = [0.1 if qber == 0.0 else qber for qber in qbers]
 
-    # The top level block size is determined by the quantum bit error rate.
-    block_size = int(np.round(0.73 / qber))
+    # The top level block size of each key is determined by its quantum
+    # bit error rate. Keys shorter than that block are checked as a whole
+    # at least once.
+    block_sizes = [
+        min(int(np.round(0.73 / qber)), max(key_length, 1))
+        for qber, key_length in zip(qbers, key_lengths)
+    ]
 
     iteration = 0
 
-    while block_size <= key_length:
-        # The identity permutation is used for the first iteration.
-        permutation = np.arange(key_length)
+    while True:
+        blocks = []
+        current_block_parities = []
+
+        for i, key_length in enumerate(key_lengths):
+            # Keys whose blocks have outgrown them are done.
+            if block_sizes[i] > key_length:
+                continue
 
-        if iteration > 0:
-            # Randomly shuffle Bob's key.
-            rng = np.random.default_rng()
-            permutation = rng.permutation(key_length)
+            if iteration > 0 or shuffle_first_pass:
+                # Randomly shuffle Bob's key.
+                permutation = randomness.permutation(key_length)
+            else:
+                # The identity permutation is used for the first iteration.
+                permutation = np.arange(key_length)
+
+            # Referring to bits by their index in the concatenated keys.
+            permutation = permutation + key_starts[i]
             shuffled_key = noisy_key[permutation]
 
-            # Increasing block size for current iteration.
-            block_size *= 2
-        else:
-            # The key is not shuffled during the first iteration.
-            shuffled_key = noisy_key.copy()
+            if iteration > 0:
+                # Increasing block size for current iteration.
+                block_sizes[i] *= 2
 
-        num_blocks = int(np.ceil(key_length / block_size))
+            block_starts = np.arange(0, key_length, block_sizes[i])
+            blocks += np.split(permutation, block_starts[1:])
 
-        for block_index in range(num_blocks):
-            block = None
-            block_indices = None
+            # Computing current block parities.
+            current_block_parities.append(np.add.reduceat(shuffled_key, block_starts) % 2)
 
-            block_start = block_size * block_index
+        if not blocks:
+            break
 
-            if block_index < num_blocks - 1:
-                block_end = block_size * (block_index + 1)
+        # Requesting correct block parities. All questions of the pass are
+        # submitted at once, so that they can be pipelined.
+        correct_block_parities = np.array(parity_channel.ask_parities(blocks))
 
-                block = shuffled_key[block_start:block_end]
-                block_indices = permutation[block_start:block_end]
-            else:
-                # The final block is not guaranteed to have the exact block size.
-                block = shuffled_key[block_start:]
-                block_indices = permutation[block_start:]
+        # Determining error parities.
+        error_parities = np.concatenate(current_block_parities) ^ correct_block_parities
 
-            # Computing current block parity.
-            current_block_parity = np.sum(block) % 2
+        # Correcting one-bit errors for blocks with odd error parity.
+        odd_blocks = [blocks[i] for i in np.flatnonzero(error_parities)]
+        batched_binary_algorithm(noisy_key, odd_blocks, parity_channel)
 
-            # Requesting correct block parity.
-            correct_block_parity = ask_parity_fn(block_indices)
+        iteration += 1
 
-            # Determining error parity.
-            error_parity = current_block_parity ^ correct_block_parity
+    return [
+        noisy_key[key_starts[i]:key_starts[i + 1]] for i in range(len(key_lengths))
+    ]
 
-            # Correcting one-bit errors for blocks with odd error parity.
-            if error_parity == 1:
-                updated_block = binary_algorithm(block, block_indices, ask_parity_fn)
-                noisy_key[block_indices] = updated_block
+def get_segment_bounds(key_length, num_workers):
+    """
+    Splits a key into contiguous segments which can be reconciled
+    independently, one for each worker, but not shorter than
+    MIN_SEGMENT_SIZE.
 
-        iteration += 1
+    Returns a list containing the start and end index of each segment.
+    """
+    num_segments = max(1, min(num_workers, key_length // MIN_SEGMENT_SIZE))
+    boundaries = np.linspace(0, key_length, num_segments + 1).astype(int)
+    return [
+        (int(boundaries[i]), int(boundaries[i + 1])) for i in range(num_segments)
+    ]
 
-    return noisy_key
+def _ask_segment_parities(ask_segment_parity_fn, segment_id, blocks):
+    """
+    Asks for the parities of many blocks of a segment, pipelining the
+    questions if ask_segment_parity_fn is a channel.
+    """
+    if hasattr(ask_segment_parity_fn, "ask_parities"):
+        return ask_segment_parity_fn.ask_parities(blocks, segment_id=segment_id)
+    return [ask_segment_parity_fn(segment_id, block_indices) for block_indices in blocks]
+
+class _SegmentParityChannel:
+    """
+    A parity channel for the questions of a single segment.
+    """
+
+    def __init__(self, ask_segment_parity_fn, segment_id):
+        self._ask_segment_parity_fn = ask_segment_parity_fn
+        self._segment_id = segment_id
 
-def get_ask_block_parity_fn(secret_key, socket):
+    def ask_parities(self, blocks):
+        return _ask_segment_parities(self._ask_segment_parity_fn, self._segment_id, blocks)
+
+class _PipeParityChannel:
     """
-    Returns a function for requesting block parities that is compatible
-    with the signature expected by client_cascade, but which communicates
-    over a NetQasm socket.
+    A parity channel forwarding the questions of a worker process to
+    its parent process over a pipe.
     """
 
-    secret_key = np.array(secret_key)
+    def __init__(self, connection, segment_id):
+        self._connection = connection
+        self._segment_id = segment_id
 
-    def ask_block_parity(block_indices):
-        request = ",".join([str(b) for b in list(block_indices)])
+    def ask_parities(self, blocks):
+        # The blocks are sent as a single array of indices along with the
+        # length of each block, which is much cheaper to pickle than a list
+        # of blocks.
+        block_lengths = [len(block_indices) for block_indices in blocks]
+        indices = np.concatenate(blocks) if blocks else np.zeros(0, dtype=int)
+        self._connection.send(("parities", self._segment_id, (indices, block_lengths)))
+        return self._connection.recv()
 
-        socket.send(request)
+def _reconcile_segment(segment_id, segment, qber, connection):
+    """
+    Runs Cascade on a single segment in a worker process, forwarding parity
+    questions to the parent process over a pipe.
+    """
+    parity_channel = _PipeParityChannel(connection, segment_id)
+    corrected_segment = client_cascade(segment, qber, parity_channel)
+    connection.send(("done", segment_id, corrected_segment))
+    connection.close()
 
-        response = socket.recv()
+def client_cascade_segmented(noisy_key, qber, ask_segment_parity_fn, num_workers):
+    """
+    Runs Cascade on independent segments of a key at the same time, using a
+    pool of worker processes.
+
+    The parity questions of all workers are answered by the calling process
+    through ask_segment_parity_fn, which takes a segment id and block indices
+    relative to the start of the segment. This allows the questions of all
+    segments to be multiplexed over a single channel. The questions of each
+    worker are routed by a thread of its own, so that the round trips of all
+    segments overlap. If ask_segment_parity_fn is a ParityChannel, the
+    questions of each worker are also pipelined.
+    """
+    noisy_key = np.array(noisy_key)
+    segment_bounds = get_segment_bounds(len(noisy_key), num_workers)
+
+    # Without multiple segments, there is nothing to parallelize.
+    if len(segment_bounds) == 1:
+        return client_cascade(
+            noisy_key,
+            qber,
+            _SegmentParityChannel(ask_segment_parity_fn, 0),
+        )
+
+    pending_segments = SimpleQueue()
+    for segment_id in range(len(segment_bounds)):
+        pending_segments.put(segment_id)
+
+    errors = []
+
+    def reconcile_segments():
+        try:
+            while True:
+                # Taking the next segment in a single step, as another
+                # thread may take the last one between a check and a get.
+                try:
+                    segment_id = pending_segments.get_nowait()
+                except Empty:
+                    break
+
+                start, end = segment_bounds[segment_id]
+
+                parent_connection, child_connection = _WORKER_CONTEXT.Pipe()
+                worker = _WORKER_CONTEXT.Process(
+                    target=_reconcile_segment,
+                    args=(segment_id, noisy_key[start:end], qber, child_connection),
+                    daemon=True,
+                )
+                worker.start()
+                child_connection.close()
+
+                # Routing parity questions from the worker until it has
+                # reconciled its segment.
+                message_type, _, payload = parent_connection.recv()
+
+                while message_type == "parities":
+                    indices, block_lengths = payload
+                    blocks = np.split(indices, np.cumsum(block_lengths)[:-1])
+                    parent_connection.send(_ask_segment_parities(
+                        ask_segment_parity_fn,
+                        segment_id,
+                        blocks,
+                    ))
+                    message_type, _, payload = parent_connection.recv()
+
+                noisy_key[start:end] = payload
+
+                worker.join()
+                parent_connection.close()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        Thread(
+            target=reconcile_segments,
+            name=f"{current_thread().name}-cascade-segments-{i}",
+            daemon=True,
+        )
+        for i in range(min(num_workers, len(segment_bounds)))
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
 
-        return int(response)
+    if errors:
+        raise errors[0]
 
-    return ask_block_parity
+    return noisy_key
 
 def get_block_parity_from_indices(full_key, indices):
     """
@@ -164,15 +423,61 @@ def send_cascade_stop(socket):
 
 def listen_and_respond_block_parity(correct_key, socket):
     """
-    Listens for block parity questions and responds.
+    Listens for block parity questions and responds. Tagged questions are
+    answered with tagged responses as soon as they arrive, so that the
+    other side can pipeline its questions.
+
+    Returns the number of parities disclosed.
     """
+    leaked_bits = 0
+
     question = socket.recv()
 
     while question != "STOP":
-        block_indices = [int(s) for s in question.split(",")]
+        _, tag, block_indices = parse_parity_question(question)
         correct_parity = get_block_parity_from_indices(
             correct_key,
             block_indices,
         )
-        socket.send(str(correct_parity))
+        socket.send(format_parity_answer(tag, correct_parity))
+        leaked_bits += 1
+        question = socket.recv()
+
+    return leaked_bits
+
+def listen_and_respond_block_parity_batch(correct_keys, socket):
+    """
+    Listens for block parity questions about a batch of keys reconciled
+    with client_cascade_batch and responds. Block indices refer to the
+    concatenation of the keys.
+
+    Returns the number of parities disclosed.
+    """
+    return listen_and_respond_block_parity(
+        np.concatenate([np.array(correct_key) for correct_key in correct_keys]),
+        socket,
+    )
+
+def listen_and_respond_segment_parity(correct_key, num_workers, socket):
+    """
+    Listens for block parity questions tagged with a segment id and responds.
+
+    Returns the number of parities disclosed.
+    """
+    segment_bounds = get_segment_bounds(len(correct_key), num_workers)
+    leaked_bits = 0
+
+    question = socket.recv()
+
+    while question != "STOP":
+        segment_id, tag, block_indices = parse_parity_question(question)
+        segment_start = segment_bounds[segment_id][0]
+        correct_parity = get_block_parity_from_indices(
+            correct_key,
+            [segment_start + i for i in block_indices],
+        )
+        socket.send(format_parity_answer(tag, correct_parity))
+        leaked_bits += 1
         question = socket.recv()
+
+    return leaked_bits
@@ -0,0 +1,64 @@
+import secrets
+
+import numpy as np
+
+# Polynomial hashes are evaluated modulo a Mersenne prime.
+MERSENNE_PRIME = 2**61 - 1
+
+# The number of bits of the hash that are sent as a tag.
+TAG_BITS = 32
+
+# The number of times a key is confirmed, with additional reconciliation
+# between attempts, before it is discarded.
+MAX_CONFIRMATION_ATTEMPTS = 3
+
+def polynomial_hash(key, point, tag_bits=TAG_BITS):
+    """
+    Hashes a key by evaluating a polynomial at the given point modulo
+    MERSENNE_PRIME. The coefficients of the polynomial are the 32-bit words
+    of the packed key, followed by the key length.
+
+    For a point chosen uniformly at random, two different keys of n words
+    collide with probability at most (n + 1) / MERSENNE_PRIME before the
+    hash is truncated to tag_bits.
+    """
+    key = np.asarray(key, dtype=np.uint8)
+
+    # Packing the key into 32-bit words.
+    packed_key = np.packbits(key)
+    packed_key = np.pad(packed_key, (0, -len(packed_key) % 4))
+    words = packed_key.view(">u4").tolist()
+
+    # Evaluating the polynomial with Horner's method.
+    key_hash = 0
+    for word in words + [len(key)]:
+        key_hash = (key_hash * point + word) % MERSENNE_PRIME
+
+    return key_hash % (1 << tag_bits)
+
+def confirm_key(key, socket):
+    """
+    Sends a hash of the key along with a randomly chosen hash point, and
+    receives whether it matched the hash of the other party's key.
+    """
+    point = secrets.randbelow(MERSENNE_PRIME)
+    tag = polynomial_hash(key, point)
+
+    socket.send(f"{point}:{tag}")
+
+    return socket.recv() == "1"
+
+def respond_key_confirmation(key, socket):
+    """
+    Receives a hash of the other party's key and responds whether it matches
+    the hash of the local key.
+
+    Returns whether the keys matched.
+    """
+    point, tag = [int(s) for s in socket.recv().split(":")]
+
+    confirmed = key is not None and polynomial_hash(key, point) == tag
+
+    socket.send(str(int(confirmed)))
+
+    return confirmed
@@ -0,0 +1,137 @@
+import base64
+import hashlib
+
+import numpy as np
+
+# The name of the compact key encoding, which is stored with every encoded
+# key so that readers can recognize it.
+COMPACT_ENCODING = "base64-packbits"
+
+# The fields of a result which contain keys.
+KEY_FIELDS = ["secret_key", "relayed_key"]
+KEY_LIST_FIELDS = ["secret_keys"]
+KEY_DICT_FIELDS = ["peer_keys"]
+
+def key_hash(packed_key, key_length):
+    """
+    Returns the SHA-256 hash of a packed key and its length, as a hex string.
+    The length is included since the packed key is padded to whole bytes.
+    """
+    return hashlib.sha256(key_length.to_bytes(8, "big") + packed_key).hexdigest()
+
+class PackedKey:
+    """
+    A key held as packed bits, to which bits can be appended up to a fixed
+    capacity. Long keys assembled from many windows are held this way, as a
+    list would take a pointer to an integer object for every key bit.
+    """
+
+    def __init__(self, capacity):
+        self._packed_bits = np.zeros(-(-capacity // 8), dtype=np.uint8)
+        self._capacity = capacity
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, bits):
+        """
+        Appends bits to the key.
+        """
+        if self._length + len(bits) > self._capacity:
+            raise ValueError("Key exceeds its capacity")
+
+        start = self._length // 8
+
+        # Unpacking the last, partially filled byte, so that the bits are
+        # packed starting from a byte boundary.
+        partial_byte = np.unpackbits(self._packed_bits[start:start + 1], count=self._length % 8)
+        packed_bits = np.packbits(np.concatenate([partial_byte, np.asarray(bits, dtype=np.uint8)]))
+
+        self._packed_bits[start:start + len(packed_bits)] = packed_bits
+        self._length += len(bits)
+
+    def packed_bits(self):
+        """
+        Returns the packed bits of the key as bytes, padded with zeros to
+        whole bytes.
+        """
+        return self._packed_bits[:-(-self._length // 8)].tobytes()
+
+    def tolist(self):
+        """
+        Returns the key as a list of bits.
+        """
+        return np.unpackbits(self._packed_bits, count=self._length).tolist()
+
+def encode_key(key):
+    """
+    Encodes a key as the base64 representation of its packed bits, along
+    with its length and hash. Keys which are None are left as they are.
+    """
+    if key is None:
+        return None
+
+    key_length = len(key)
+    if isinstance(key, PackedKey):
+        packed_key = key.packed_bits()
+    else:
+        packed_key = np.packbits(np.asarray(key, dtype=np.uint8)).tobytes()
+
+    return {
+        "encoding": COMPACT_ENCODING,
+        "length": key_length,
+        "sha256": key_hash(packed_key, key_length),
+        "data": base64.b64encode(packed_key).decode("ascii"),
+    }
+
+def decode_key(encoded_key):
+    """
+    Decodes a key encoded by encode_key into a list of bits.
+    """
+    if encoded_key is None:
+        return None
+
+    packed_key = np.frombuffer(base64.b64decode(encoded_key["data"]), dtype=np.uint8)
+    return np.unpackbits(packed_key, count=encoded_key["length"]).tolist()
+
+def expand_key(key):
+    """
+    Returns a packed key as a list of bits. Other keys are left as they are.
+    """
+    if isinstance(key, PackedKey):
+        return key.tolist()
+    return key
+
+def _map_keys(result, fn):
+    """
+    Returns a copy of an application result with fn applied to all keys.
+    """
+    result = dict(result)
+
+    for field in KEY_FIELDS:
+        if field in result:
+            result[field] = fn(result[field])
+
+    for field in KEY_LIST_FIELDS:
+        if field in result:
+            result[field] = [fn(key) for key in result[field]]
+
+    for field in KEY_DICT_FIELDS:
+        if field in result:
+            result[field] = {name: fn(key) for name, key in result[field].items()}
+
+    return result
+
+def encode_key_result(result):
+    """
+    Returns a copy of an application result with all keys encoded.
+    """
+    return _map_keys(result, encode_key)
+
+def expand_key_result(result):
+    """
+    Returns a copy of an application result with all packed keys expanded
+    into lists of bits.
+    """
+    return _map_keys(result, expand_key)
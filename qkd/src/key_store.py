@@ -0,0 +1,259 @@
+import fcntl
+import os
+
+from contextlib import contextmanager
+from threading import Lock
+
+import numpy as np
+
+_MAGIC = 0x3245524f5453444b  # "KDSTORE2"
+_HEADER_FIELDS = 6
+_HEADER_SIZE = _HEADER_FIELDS * np.dtype(np.uint64).itemsize
+
+# Indices of the header fields.
+_MAGIC_FIELD = 0
+_CAPACITY_FIELD = 1
+_WRITE_POSITION_FIELD = 2
+_READ_POSITION_FIELD = 3
+_NEXT_KEY_ID_FIELD = 4
+_RELEASE_POSITION_FIELD = 5
+
+# The number of bits a new key store has room for, unless another capacity
+# is given.
+DEFAULT_CAPACITY = 2**20
+
+class KeyStore:
+    """
+    A persistent, append-only store for reconciled secret keys.
+
+    Key bits are kept in a memory-mapped ring buffer with one byte per bit,
+    so that consumers can take bits as NumPy views of the mapped file without
+    copying them. Bits are appended as keys are produced and consumed in the
+    order in which they were appended, independently of key boundaries.
+
+    Taken bits stay reserved until the consumer releases them, at which
+    point they are zeroed and their space can be reused. All updates of the
+    header are made under a lock on the file, so that producers and
+    consumers can run in separate processes.
+
+    Each appended key is assigned a sequential identifier. As long as both
+    parties append the same keys in the same order, their identifiers stay
+    in sync, which store_key_synchronized verifies over the classical channel.
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        """
+        Opens the key store at the given path, creating it with room for
+        capacity bits if it doesn't exist yet.
+        """
+        self._lock = Lock()
+
+        try:
+            self._file = open(path, "x+b")
+        except FileExistsError:
+            self._file = open(path, "r+b")
+
+        with self._locked():
+            if os.fstat(self._file.fileno()).st_size == 0:
+                self._file.truncate(_HEADER_SIZE + capacity)
+
+                self._header = np.memmap(self._file, dtype=np.uint64, mode="r+", shape=(_HEADER_FIELDS,))
+                self._header[_MAGIC_FIELD] = _MAGIC
+                self._header[_CAPACITY_FIELD] = capacity
+                self._header.flush()
+            else:
+                self._header = np.memmap(self._file, dtype=np.uint64, mode="r+", shape=(_HEADER_FIELDS,))
+
+        if self._header[_MAGIC_FIELD] != _MAGIC:
+            raise ValueError(f"{path} is not a key store")
+
+        self._capacity = int(self._header[_CAPACITY_FIELD])
+        self._bits = np.memmap(
+            self._file,
+            dtype=np.uint8,
+            mode="r+",
+            offset=_HEADER_SIZE,
+            shape=(self._capacity,),
+        )
+
+    @contextmanager
+    def _locked(self):
+        """
+        Locks the key store against other threads and processes.
+        """
+        with self._lock:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def available(self):
+        """
+        The number of stored bits which have not been taken yet.
+        """
+        return int(self._header[_WRITE_POSITION_FIELD] - self._header[_READ_POSITION_FIELD])
+
+    @property
+    def taken(self):
+        """
+        The number of taken bits which have not been released yet.
+        """
+        return int(self._header[_READ_POSITION_FIELD] - self._header[_RELEASE_POSITION_FIELD])
+
+    @property
+    def free(self):
+        """
+        The number of bits which can be appended before the store is full.
+        """
+        return self._capacity - self.available - self.taken
+
+    @property
+    def next_key_id(self):
+        return int(self._header[_NEXT_KEY_ID_FIELD])
+
+    def _region(self, position, num_bits):
+        """
+        Returns the one or two slices of the buffer holding num_bits bits
+        starting at the given position, wrapping around the end of the
+        buffer if needed.
+        """
+        start = int(position % self._capacity)
+        head_length = min(num_bits, self._capacity - start)
+        return slice(start, start + head_length), slice(0, num_bits - head_length)
+
+    def append(self, key, key_id=None):
+        """
+        Appends a key to the store and returns its identifier.
+
+        If a key identifier is given, it must match the identifier the store
+        would assign to the key. This is used to detect that the stores of
+        both parties have gone out of sync.
+        """
+        key = np.asarray(key, dtype=np.uint8)
+
+        with self._locked():
+            if key_id is not None and key_id != self.next_key_id:
+                raise RuntimeError(
+                    f"Key identifier {key_id} is out of sync with the key store, "
+                    f"which expected {self.next_key_id}"
+                )
+
+            # Bits which have been taken but not released are still in use,
+            # so they are never overwritten.
+            if len(key) > self.free:
+                raise RuntimeError("Not enough free space in the key store")
+
+            # Writing the key, wrapping around the end of the buffer if needed.
+            head, tail = self._region(self._header[_WRITE_POSITION_FIELD], len(key))
+            head_length = head.stop - head.start
+            self._bits[head] = key[:head_length]
+            self._bits[tail] = key[head_length:]
+            self._bits.flush()
+
+            # The header is only updated once the key bits are on disk, so that
+            # a crash never exposes partially written keys.
+            key_id = self.next_key_id
+            self._header[_WRITE_POSITION_FIELD] += len(key)
+            self._header[_NEXT_KEY_ID_FIELD] += 1
+            self._header.flush()
+
+        return key_id
+
+    def take(self, num_bits):
+        """
+        Consumes the given number of key bits.
+
+        The bits are returned as a view of the memory-mapped buffer, which
+        remains valid until they are released with release(). Only a request
+        that wraps around the end of the buffer is copied.
+        """
+        with self._locked():
+            if num_bits > self.available:
+                raise RuntimeError(
+                    f"Requested {num_bits} bits, but only {self.available} are available"
+                )
+
+            head, tail = self._region(self._header[_READ_POSITION_FIELD], num_bits)
+
+            if tail.stop == 0:
+                bits = self._bits[head]
+            else:
+                bits = np.concatenate((self._bits[head], self._bits[tail]))
+
+            self._header[_READ_POSITION_FIELD] += num_bits
+            self._header.flush()
+
+        return bits
+
+    def release(self, num_bits):
+        """
+        Releases the given number of taken bits, in the order in which they
+        were taken. The released bits are zeroed, so that no key material
+        remains in the store once it has been used, and their space can be
+        reused by later appends.
+        """
+        with self._locked():
+            if num_bits > self.taken:
+                raise RuntimeError(
+                    f"Released {num_bits} bits, but only {self.taken} are taken"
+                )
+
+            head, tail = self._region(self._header[_RELEASE_POSITION_FIELD], num_bits)
+            self._bits[head] = 0
+            self._bits[tail] = 0
+            self._bits.flush()
+
+            self._header[_RELEASE_POSITION_FIELD] += num_bits
+            self._header.flush()
+
+    def close(self):
+        self._bits.flush()
+        self._header.flush()
+        del self._bits
+        del self._header
+        self._file.close()
+
+def store_key_synchronized(key_store, secret_key, socket):
+    """
+    Appends a secret key to the local key store, keeping its identifier in
+    sync with the key store of the other party.
+
+    Both parties announce the identifier they are about to assign along
+    with whether they can store the key, which takes holding the key and
+    enough free space in the key store, before either of them appends
+    anything. The key is only stored when both parties can store it, so
+    that a full key store skips the key on both sides rather than stopping
+    key generation. Consumers only ever free space, so a key which fits
+    when announced still fits when it is appended. If the identifiers
+    differ, the stores are out of sync and both parties raise an error
+    without storing the key.
+
+    Returns the key identifier, or None if the key was not stored.
+    """
+    can_store = secret_key is not None and len(secret_key) <= key_store.free
+
+    socket.send(f"{key_store.next_key_id}:{int(can_store)}")
+    remote_key_id, remote_can_store = [int(s) for s in socket.recv().split(":")]
+
+    if remote_key_id != key_store.next_key_id:
+        raise RuntimeError(
+            f"Key identifier {key_store.next_key_id} is out of sync with the "
+            f"other party's key store, which expected {remote_key_id}"
+        )
+
+    if can_store and remote_can_store:
+        return key_store.append(secret_key, key_id=remote_key_id)
+
+    return None
@@ -0,0 +1,354 @@
+import argparse
+import importlib
+import json
+import logging
+import sys
+import time
+import types
+
+from queue import Empty, Queue
+from threading import Lock, Thread
+
+import numpy as np
+
+import randomness
+import topology
+
+# The applications run by the local backend, by role.
+APP_MODULES = {
+    "alice": "app_alice",
+    "bob": "app_bob",
+    "charlie": "app_charlie",
+}
+
+# Bell-pair outcomes are sampled in chunks of at least this many pairs.
+PAIR_CHUNK_SIZE = 4096
+
+# The number of seconds after which a classical message is considered lost.
+RECV_TIMEOUT = 60
+
+# The network of the current local run, which the sockets and connections
+# created by the applications attach to.
+_network = None
+
+class _Link:
+    """
+    The EPR pairs shared by two EPR sockets.
+
+    Each pair is sampled from a Werner state with the given fidelity, which
+    is the Bell state |Phi+> with probability F and each of the other three
+    Bell states with probability (1 - F) / 3. As only Z and X measurements
+    are made, a pair is represented by hidden variables: the outcomes of the
+    creating party in both bases, and whether the outcomes of the receiving
+    party are flipped in each basis.
+
+    An eavesdropper measuring in the Z basis leaves the Z outcomes intact,
+    while making the X outcomes of both parties independent.
+    """
+
+    def __init__(self, fidelity, rng):
+        self._fidelity = fidelity
+        self._rng = rng
+        self._lock = Lock()
+
+        self._outcomes = np.zeros((0, 2), dtype=np.uint8)
+        self._flips = np.zeros((0, 2), dtype=np.uint8)
+        self._num_pairs = [0, 0]
+
+        self.eavesdrop = False
+
+    def _sample(self, num_pairs):
+        # The Bell states |Phi+>, |Phi->, |Psi+> and |Psi-> flip the Z
+        # outcome when they are one of the last two, and the X outcome when
+        # they are the second or the last.
+        p = (1 - self._fidelity) / 3
+        bell_states = self._rng.choice(4, size=num_pairs, p=[self._fidelity, p, p, p])
+
+        outcomes = self._rng.integers(2, size=(num_pairs, 2), dtype=np.uint8)
+        flips = np.stack([bell_states >> 1, bell_states & 1], axis=1).astype(np.uint8)
+
+        if self.eavesdrop:
+            flips[:, 1] = self._rng.integers(2, size=num_pairs)
+
+        self._outcomes = np.concatenate([self._outcomes, outcomes])
+        self._flips = np.concatenate([self._flips, flips])
+
+    def next_pair(self, party):
+        """
+        Returns the outcomes of the next pair for the creating (0) or
+        receiving (1) party, in the Z and X bases.
+        """
+        with self._lock:
+            pair_id = self._num_pairs[party]
+            self._num_pairs[party] += 1
+
+            if pair_id >= len(self._outcomes):
+                self._sample(max(PAIR_CHUNK_SIZE, len(self._outcomes)))
+
+            outcomes = self._outcomes[pair_id]
+            if party == 1:
+                outcomes = outcomes ^ self._flips[pair_id]
+
+        return outcomes
+
+class LocalNetwork:
+    """
+    Connects local connections, EPR sockets and classical sockets by the
+    names of their applications.
+    """
+
+    def __init__(self, fidelity=1.0, seed=None):
+        self.fidelity = fidelity
+        self._rng = np.random.default_rng(seed)
+        self._lock = Lock()
+        self._links = {}
+        self._channels = {}
+
+    def link(self, local_end, remote_end):
+        """
+        Returns the link between two (application name, EPR socket id) ends.
+        """
+        with self._lock:
+            key = frozenset([local_end, remote_end])
+            if key not in self._links:
+                self._links[key] = _Link(self.fidelity, self._rng)
+            return self._links[key]
+
+    def channel(self, sender, receiver, socket_id):
+        """
+        Returns the queue carrying messages from sender to receiver.
+        """
+        with self._lock:
+            key = (sender, receiver, socket_id)
+            if key not in self._channels:
+                self._channels[key] = Queue()
+            return self._channels[key]
+
+class LocalQubit:
+    """
+    One half of an EPR pair, which can be rotated to the X basis and
+    measured.
+    """
+
+    def __init__(self, outcomes):
+        self._outcomes = outcomes
+        self._basis = 0
+
+    def H(self):
+        self._basis ^= 1
+
+    def measure(self):
+        return int(self._outcomes[self._basis])
+
+class LocalEPRSocket:
+    """
+    Implements the parts of DerivedEPRSocket used by the applications.
+    """
+
+    def __init__(
+            self,
+            remote_app_name,
+            epr_socket_id=0,
+            remote_epr_socket_id=0,
+            min_fidelity=100,
+            eavesdrop=False,
+    ):
+        self.remote_app_name = remote_app_name
+        self.epr_socket_id = epr_socket_id
+        self.remote_epr_socket_id = remote_epr_socket_id
+        self.eavesdrop = eavesdrop
+        self._link = None
+
+    def bind(self, app_name):
+        """
+        Attaches the socket to its link, once the name of the local
+        application is known.
+        """
+        self._link = _network.link(
+            (app_name, self.epr_socket_id),
+            (self.remote_app_name, self.remote_epr_socket_id),
+        )
+        self._link.eavesdrop = self._link.eavesdrop or bool(self.eavesdrop)
+
+    def create_keep(self, number=1):
+        return [LocalQubit(self._link.next_pair(0)) for _ in range(number)]
+
+    def recv_keep(self, number=1):
+        return [LocalQubit(self._link.next_pair(1)) for _ in range(number)]
+
+class LocalSocket:
+    """
+    Implements the parts of the NetQASM Socket used by the applications.
+    """
+
+    def __init__(self, app_name, remote_app_name, socket_id=0, log_config=None):
+        self._outgoing = _network.channel(app_name, remote_app_name, socket_id)
+        self._incoming = _network.channel(remote_app_name, app_name, socket_id)
+
+    def send(self, message):
+        self._outgoing.put(message)
+
+    def recv(self):
+        try:
+            return self._incoming.get(timeout=RECV_TIMEOUT)
+        except Empty:
+            raise TimeoutError("No message received from the remote application")
+
+class LocalConnection:
+    """
+    Implements the parts of NetQASMConnection used by the applications.
+    Measurements are available immediately, so flushing does nothing.
+    """
+
+    def __init__(self, app_name, log_config=None, epr_sockets=()):
+        self.app_name = app_name
+        for epr_socket in epr_sockets:
+            epr_socket.bind(app_name)
+
+    def flush(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+def _import_app(module_name):
+    """
+    Imports an application and points it to the local backend. When
+    NetQASM is not installed, the modules the application imports from it
+    are provided by the local backend.
+    """
+    try:
+        import netqasm
+    except ImportError:
+        backend_modules = {
+            "netqasm": {},
+            "netqasm.logging": {},
+            "netqasm.logging.glob": {"get_netqasm_logger": lambda: logging.getLogger("netqasm")},
+            "netqasm.sdk": {},
+            "netqasm.sdk.external": {"NetQASMConnection": LocalConnection, "Socket": LocalSocket},
+            "epr_socket": {"DerivedEPRSocket": LocalEPRSocket},
+        }
+        for name, attributes in backend_modules.items():
+            if name not in sys.modules:
+                module = types.ModuleType(name)
+                module.__dict__.update(attributes)
+                sys.modules[name] = module
+
+    # The applications of all roles create their connection and sockets
+    # in the shared runner.
+    app = importlib.import_module(module_name)
+    runner = importlib.import_module("runner")
+    runner.NetQASMConnection = LocalConnection
+    runner.Socket = LocalSocket
+    runner.EPRSocket = LocalEPRSocket
+
+    return app
+
+def _role_params(role, params):
+    """
+    Selects the parameters passed to the application of the given role,
+    according to the roles listed in application.json.
+    """
+    with open(topology.APPLICATION_CONFIG_PATH, "r") as f:
+        application_config = json.load(f)
+
+    role_param_names = {
+        value["name"]
+        for param in application_config
+        if role in param["roles"]
+        for value in param["values"]
+    }
+
+    return {name: value for name, value in params.items() if name in role_param_names}
+
+def run_local(fidelity=1.0, eavesdropper=False, seed=None, **params):
+    """
+    Runs the applications of all roles as threads of the current process,
+    on a local backend instead of a QNE experiment.
+
+    Arguments:
+
+    fidelity - The elementary link fidelity of all links.
+    eavesdropper - Determines whether an eavesdropper measures all pairs.
+    seed - The seed used to sample EPR pairs and to seed the randomness of
+    the applications, which makes the run reproducible. The randomness is
+    only secure without a seed.
+    params - The application parameters, as in application.json.
+
+    Returns:
+
+    results - A dictionary containing the result of each role.
+    """
+    global _network
+    _network = LocalNetwork(fidelity, seed)
+    randomness.seed(seed)
+
+    roles = topology.load_topology(int(params.get("multi_party", 0))).roles()
+
+    results = {}
+    errors = []
+
+    def run_app(role, app):
+        app_config = types.SimpleNamespace(app_name=role, log_config=None)
+        try:
+            results[role] = app.main(
+                app_config=app_config,
+                eavesdropper=eavesdropper,
+                **_role_params(role, params),
+            )
+        except Exception as e:
+            errors.append(e)
+
+    apps = {role: _import_app(APP_MODULES[role]) for role in roles}
+    # The threads are named after the roles, which keys the randomness of
+    # each role when it is seeded.
+    threads = [
+        Thread(target=run_app, args=(role, app), name=role, daemon=True)
+        for role, app in apps.items()
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    randomness.seed(None)
+
+    # Every run adds a log file handler to the applications' logger.
+    logger = sys.modules["runner"].logger
+    for handler in list(logger.handlers):
+        handler.close()
+        logger.removeHandler(handler)
+
+    if errors:
+        raise errors[0]
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Runs QKD sessions on the local backend.",
+    )
+    parser.add_argument("--fidelity", type=float, default=1.0)
+    parser.add_argument("--eavesdropper", action="store_true")
+    parser.add_argument("--key-length", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=100)
+    args = parser.parse_args()
+
+    num_keys = 0
+    start_time = time.perf_counter()
+
+    for _ in range(args.runs):
+        results = run_local(args.fidelity, args.eavesdropper, key_length=args.key_length)
+        alice_key = results["alice"]["secret_key"]
+        num_keys += alice_key is not None and alice_key == results["bob"]["secret_key"]
+
+    elapsed_time = time.perf_counter() - start_time
+    print(
+        f"{num_keys}/{args.runs} keys established in {elapsed_time:.1f} s "
+        f"({args.runs / elapsed_time * 60:.0f} sessions/min)"
+    )
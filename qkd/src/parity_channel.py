@@ -0,0 +1,143 @@
+from threading import Condition, Lock
+
+class ParityChannel:
+    """
+    A pipelined channel for asking block parities over a NetQASM socket.
+
+    Questions are tagged, so that many of them can be in flight at the same
+    time and responses can be matched to their questions in any order. This
+    makes reconciliation bound by bandwidth instead of round-trip latency.
+
+    A question for block indices [3, 1, 5] with tag 7 is sent as "7#3,1,5",
+    or as "2|7#3,1,5" if it refers to segment 2 of a segmented key. The
+    response is sent as "7#<parity>".
+
+    The number of parities received is counted in leaked_bits.
+
+    The channel can be shared by several threads. One of the threads
+    waiting for a response receives from the socket at a time, and
+    responses to the questions of other threads are handed over to them.
+    """
+
+    def __init__(self, socket):
+        self._socket = socket
+        self._next_tag = 0
+        self._responses = {}
+        self._send_lock = Lock()
+        self._responses_changed = Condition()
+        self._receiving = False
+        self.leaked_bits = 0
+
+    def __call__(self, block_indices):
+        """
+        Asks for a single block parity, which makes the channel usable
+        wherever an ask_parity_fn is expected.
+        """
+        return self.result(self.submit(block_indices))
+
+    def submit(self, block_indices, segment_id=None):
+        """
+        Sends a question without waiting for its response and returns
+        the tag of the question.
+        """
+        with self._send_lock:
+            tag = self._next_tag
+            self._next_tag += 1
+
+            request = ",".join([str(b) for b in list(block_indices)])
+            request = f"{tag}#{request}"
+            if segment_id is not None:
+                request = f"{segment_id}|{request}"
+
+            self._socket.send(request)
+
+        return tag
+
+    def result(self, tag):
+        """
+        Returns the parity for a previously submitted question, receiving
+        responses until the one for the given tag has arrived.
+        """
+        with self._responses_changed:
+            while tag not in self._responses:
+                # Another thread is receiving, and will hand over the
+                # response if it is for this question.
+                if self._receiving:
+                    self._responses_changed.wait()
+                    continue
+
+                self._receiving = True
+                self._responses_changed.release()
+                try:
+                    response = self._socket.recv()
+                finally:
+                    self._responses_changed.acquire()
+                    self._receiving = False
+
+                response_tag, parity = response.split("#")
+                self._responses[int(response_tag)] = int(parity)
+                self.leaked_bits += 1
+                self._responses_changed.notify_all()
+
+            return self._responses.pop(tag)
+
+    def ask_parities(self, blocks, segment_id=None):
+        """
+        Asks for the parities of many blocks at once, submitting all
+        questions before waiting for any response.
+        """
+        tags = [self.submit(block_indices, segment_id) for block_indices in blocks]
+        return [self.result(tag) for tag in tags]
+
+class CallableParityChannel:
+    """
+    Adapts a function answering one block parity question at a time to the
+    interface of ParityChannel.
+    """
+
+    def __init__(self, ask_parity_fn):
+        self._ask_parity_fn = ask_parity_fn
+
+    def __call__(self, block_indices):
+        return self._ask_parity_fn(block_indices)
+
+    def ask_parities(self, blocks):
+        return [self._ask_parity_fn(block_indices) for block_indices in blocks]
+
+def as_parity_channel(ask_parity_fn):
+    """
+    Returns a channel which can ask many block parities at once, wrapping
+    plain functions in a CallableParityChannel.
+    """
+    if hasattr(ask_parity_fn, "ask_parities"):
+        return ask_parity_fn
+    return CallableParityChannel(ask_parity_fn)
+
+def parse_parity_question(question):
+    """
+    Parses a block parity question into its segment id, tag and block
+    indices. The segment id and tag are None for untagged questions.
+    """
+    segment_id = None
+    tag = None
+
+    if "|" in question:
+        segment_id, question = question.split("|")
+        segment_id = int(segment_id)
+
+    if "#" in question:
+        tag, question = question.split("#")
+        tag = int(tag)
+
+    block_indices = [int(s) for s in question.split(",")]
+
+    return segment_id, tag, block_indices
+
+def format_parity_answer(tag, parity):
+    """
+    Formats the answer to a block parity question, tagging it if the
+    question was tagged.
+    """
+    if tag is None:
+        return str(parity)
+    return f"{tag}#{parity}"
@@ -0,0 +1,86 @@
+from queue import Queue
+from threading import Thread, current_thread
+
+import sessions
+
+_STAGE_FAILED = object()
+
+# The largest number of key bits processed at once. Longer keys are always
+# generated in windows, so that memory stays bounded however long the key.
+MAX_WINDOW_SIZE = 1 << 16
+
+def split_into_windows(key_length, window_size):
+    """
+    Splits a key into windows of at most window_size bits, which are
+    generated one after the other. A window size of 0 selects windows of
+    MAX_WINDOW_SIZE bits, which is also the largest window size allowed.
+
+    The key is split into as few windows as possible, of nearly equal size,
+    rather than into full windows followed by a remainder. A short last
+    window would estimate its QBER from a handful of bits, and a failed
+    window discards the whole key.
+
+    Returns a list containing the length of each window.
+    """
+    if window_size <= 0 or window_size > MAX_WINDOW_SIZE:
+        window_size = MAX_WINDOW_SIZE
+
+    num_windows = max(1, -(-key_length // window_size))
+    return sessions.split_key_length(key_length, num_windows)
+
+def stream_pipelined(quantum_stage, classical_stage, items):
+    """
+    Generates a stream of results, one for each item, overlapping the
+    quantum stage of item k+1 with the classical stage of item k.
+
+    The quantum stage runs on a worker thread ahead of the classical stage,
+    handing over its measurements through a queue holding a single batch.
+    While the classical stage processes item k, the worker may therefore
+    hold the measurements of item k+1 in the queue and be measuring item
+    k+2, so at most three batches of measurements are held at a time. As
+    results are yielded as soon as they are available, memory stays
+    bounded by the size of a few items.
+
+    Arguments:
+
+    quantum_stage - A function taking an item and returning its measurement
+        results.
+    classical_stage - A function taking an item and its measurement results,
+        and returning the result for the item.
+    items - A list of items, such as the lengths of the keys to generate.
+
+    Yields:
+
+    result - The result of the classical stage for each item, in order.
+    """
+    if len(items) == 1:
+        # There is nothing to overlap with for a single item.
+        yield classical_stage(items[0], quantum_stage(items[0]))
+        return
+
+    measurement_queue = Queue(maxsize=1)
+    errors = []
+
+    def produce():
+        try:
+            for item in items:
+                measurement_queue.put(quantum_stage(item))
+        except Exception as e:
+            errors.append(e)
+            measurement_queue.put(_STAGE_FAILED)
+
+    worker = Thread(target=produce, name=f"{current_thread().name}-quantum-stage", daemon=True)
+    worker.start()
+
+    for item in items:
+        measurement_results = measurement_queue.get()
+
+        if measurement_results is _STAGE_FAILED:
+            break
+
+        yield classical_stage(item, measurement_results)
+
+    worker.join()
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,191 @@
+import cProfile
+import os
+import pstats
+import time
+import tracemalloc
+
+from contextlib import contextmanager, nullcontext
+from threading import Lock
+
+# The environment variable which enables profiling when set, in addition
+# to the profile option in application.json.
+PROFILE_VARIABLE = "QKD_PROFILE"
+
+# Setting the environment variable to this value profiles CPU time only, as
+# tracing memory slows down allocation-heavy code several times over.
+CPU_ONLY = "cpu"
+
+# The number of allocation sites listed per phase in the report.
+NUM_ALLOCATION_SITES = 10
+
+# Allocations made by the profilers themselves are left out of the report.
+_ALLOCATION_FILTERS = [
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+class PhaseProfiler:
+    """
+    Profiles the phases of the protocol, such as measurement, sifting and
+    reconciliation, with cProfile for CPU time and tracemalloc for memory.
+
+    A phase can run many times, for example once per key, window or
+    session. The CPU profiles of all runs of a phase are aggregated and
+    written to <prefix>_<phase>.prof, which can be inspected with pstats or
+    snakeviz. A report with the wall time and the largest peak of traced
+    memory over a run of each phase, above the memory traced when the run
+    started, is written to <prefix>.txt, followed by the peak traced memory
+    of the whole run and the allocation sites which grew the most over it.
+
+    Memory is traced for the whole process, so the peak of tracemalloc is
+    only reset when a phase starts while no other phase is running. The
+    peak of a run which overlaps with runs of other phases, for example in
+    other threads, includes their allocations and can span more than the
+    run itself. Such runs are counted as approximate in the report.
+    Snapshots, which walk all traces, are only taken when the profiler is
+    created and closed.
+
+    Unless trace_memory is given, memory is traced unless the QKD_PROFILE
+    environment variable is set to "cpu".
+    """
+
+    def __init__(self, prefix, trace_memory=None):
+        self._prefix = prefix
+        self._lock = Lock()
+        self._phases = {}
+
+        # The number of phases running, the number of runs started so far
+        # and the peak traced memory before the last reset of the peak.
+        self._num_active_phases = 0
+        self._num_started_phases = 0
+        self._peak_memory = 0
+
+        if trace_memory is None:
+            trace_memory = os.environ.get(PROFILE_VARIABLE) != CPU_ONLY
+        self._trace_memory = trace_memory
+
+        self._started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+        if trace_memory:
+            self._start_snapshot = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+
+    def _traced_memory(self):
+        if not self._trace_memory:
+            return 0, 0
+        return tracemalloc.get_traced_memory()
+
+    def _start_run(self):
+        with self._lock:
+            # The peak is only reset while no other phase is running, after
+            # keeping it for the peak of the whole run.
+            if self._num_active_phases == 0 and self._trace_memory:
+                self._peak_memory = max(self._peak_memory, self._traced_memory()[1])
+                tracemalloc.reset_peak()
+
+            start_memory, _ = self._traced_memory()
+            overlapped = self._num_active_phases > 0
+
+            self._num_active_phases += 1
+            self._num_started_phases += 1
+
+            return start_memory, overlapped, self._num_started_phases
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Profiles the code run within the context as a run of the given phase.
+        """
+        start_memory, overlapped, run_id = self._start_run()
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler can be active at a time on recent Python
+            # versions, so a phase overlapping with another one is only
+            # timed and traced.
+            profiler = None
+
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_time = time.perf_counter() - start_time
+
+            if profiler is not None:
+                profiler.disable()
+
+            with self._lock:
+                _, peak_memory = self._traced_memory()
+
+                # The run overlapped with another one if a phase was running
+                # when it started, or if a phase started after it.
+                self._num_active_phases -= 1
+                overlapped = overlapped or self._num_started_phases != run_id
+
+                stats, num_runs, total_time, max_peak_memory, num_overlapped = self._phases.get(
+                    name,
+                    (None, 0, 0.0, 0, 0),
+                )
+
+                if profiler is not None and stats is None:
+                    stats = pstats.Stats(profiler)
+                elif profiler is not None:
+                    stats.add(profiler)
+
+                self._phases[name] = (
+                    stats,
+                    num_runs + 1,
+                    total_time + elapsed_time,
+                    max(max_peak_memory, peak_memory - start_memory),
+                    num_overlapped + overlapped,
+                )
+
+    def close(self):
+        """
+        Writes the profile of each phase and the report.
+        """
+        with open(f"{self._prefix}.txt", "w") as report:
+            for name, (stats, num_runs, total_time, peak_memory, num_overlapped) in self._phases.items():
+                if stats is not None:
+                    stats.dump_stats(f"{self._prefix}_{name}.prof")
+
+                report.write(f"{name} :: {num_runs} runs :: {total_time:.3f} s")
+                if self._trace_memory:
+                    report.write(f" :: peak {peak_memory / 2**20:.1f} MiB")
+                    if num_overlapped:
+                        report.write(f" ({num_overlapped} runs overlapped, approximate)")
+                report.write("\n")
+
+            if self._trace_memory:
+                peak_memory = max(self._peak_memory, self._traced_memory()[1])
+                end_snapshot = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+
+                report.write(f"peak {peak_memory / 2**20:.1f} MiB\n")
+                for allocation_site in end_snapshot.compare_to(self._start_snapshot, "lineno")[:NUM_ALLOCATION_SITES]:
+                    report.write(f"    {allocation_site}\n")
+
+        if self._started_tracing:
+            tracemalloc.stop()
+
+def profiling_enabled(profile=0):
+    """
+    Returns whether profiling is enabled, either by the profile option of
+    application.json or by the QKD_PROFILE environment variable, which
+    enables it unless it is empty, "0" or "false".
+    """
+    value = os.environ.get(PROFILE_VARIABLE, "").strip().lower()
+    return bool(int(profile)) or value not in ("", "0", "false")
+
+def phase(profiler, name):
+    """
+    Returns a context profiling a phase, or doing nothing if the profiler
+    is None.
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.phase(name)
@@ -0,0 +1,185 @@
+import math
+
+from statistics import NormalDist
+
+import numpy as np
+
+# Modes for estimating the quantum bit error rate. In the full disclosure
+# mode, all raw key bits beyond the target key length are disclosed. In the
+# sampled mode, only a statistically sized sample is disclosed. In the
+# Cascade mode, nothing is disclosed and the QBER is estimated from the
+# number of errors corrected by Cascade.
+FULL_DISCLOSURE = 0
+SAMPLED = 1
+CASCADE = 2
+
+# The confidence level of the reported QBER bounds.
+CONFIDENCE = 0.95
+
+# The sample is sized so that a QBER up to EXPECTED_QBER is estimated
+# within SAMPLE_TOLERANCE at the given confidence.
+EXPECTED_QBER = 0.11
+SAMPLE_TOLERANCE = 0.05
+
+# Without a sample, Cascade's block sizes are based on this QBER.
+CASCADE_PRIOR_QBER = 0.05
+
+# According to Erven 2007, the upper bound for a QBER that should be
+# identified as noise instead of eavesdropping is 14.6%. Here we round to
+# 15%. Both parties must use the same threshold, so that they agree on
+# whether to run Cascade.
+QBER_THRESHOLD = 0.15
+
+# The confidence with which enough EPR pairs are generated to end up
+# with the required number of sifted bits.
+EPR_PAIR_CONFIDENCE = 0.999
+
+def _z_score(confidence):
+    return NormalDist().inv_cdf(confidence)
+
+def sample_size(
+        expected_qber=EXPECTED_QBER,
+        tolerance=SAMPLE_TOLERANCE,
+        confidence=CONFIDENCE,
+):
+    """
+    Returns the number of sifted bits to disclose in order to estimate the
+    QBER within the given tolerance, using the normal approximation of the
+    binomial distribution.
+    """
+    z = _z_score(confidence)
+    return math.ceil(z**2 * expected_qber * (1 - expected_qber) / tolerance**2)
+
+# With biased bases, the QBER of each basis is estimated on its own, and
+# eavesdropping can only be ruled out with at least this many sampled bits
+# in each basis.
+MIN_BASIS_SAMPLE_SIZE = sample_size()
+
+def qber_upper_bound(num_errors, num_bits, confidence=CONFIDENCE):
+    """
+    Returns the one-sided Wilson score upper bound on the QBER given the
+    number of errors observed in a number of bits.
+    """
+    if num_bits == 0:
+        return 1.0
+
+    z = _z_score(confidence)
+    qber = num_errors / num_bits
+
+    center = qber + z**2 / (2 * num_bits)
+    spread = z * math.sqrt(qber * (1 - qber) / num_bits + z**2 / (4 * num_bits**2))
+
+    return min(1.0, (center + spread) / (1 + z**2 / num_bits))
+
+def required_epr_pairs(
+        num_sifted_bits,
+        sifting_probability=0.5,
+        confidence=EPR_PAIR_CONFIDENCE,
+):
+    """
+    Returns the number of EPR pairs needed to obtain at least the given
+    number of sifted bits with the given confidence.
+
+    This is the smallest n for which n * p - z * sqrt(n * p * (1 - p)) is at
+    least the number of sifted bits, where p is the sifting probability.
+    """
+    p = sifting_probability
+    z = _z_score(confidence)
+    spread = z * math.sqrt(p * (1 - p))
+
+    sqrt_n = (spread + math.sqrt(spread**2 + 4 * p * num_sifted_bits)) / (2 * p)
+
+    return math.ceil(sqrt_n**2)
+
+def sifting_probability(z_basis_probability=0.5):
+    """
+    Returns the probability that both parties measure an EPR pair in the
+    same basis when each chooses the Z basis with the given probability.
+    """
+    p = z_basis_probability
+    return p**2 + (1 - p)**2
+
+def effective_mode(mode, z_basis_probability=0.5):
+    """
+    Returns the QBER estimation mode used with the given basis bias.
+
+    With biased bases, eavesdropping in the rarely chosen basis can only be
+    detected on a sample of that basis, which Cascade's corrections of the
+    mostly single-basis key cannot provide. The Cascade mode then falls
+    back to the sampled mode.
+    """
+    if mode == CASCADE and z_basis_probability != 0.5:
+        return SAMPLED
+    return mode
+
+def num_epr_pairs(key_length, mode, z_basis_probability=0.5):
+    """
+    Returns the number of EPR pairs to generate for a key of the given
+    length when estimating the QBER with the given mode.
+    """
+    p = sifting_probability(z_basis_probability)
+    mode = effective_mode(mode, z_basis_probability)
+
+    if z_basis_probability != 0.5:
+        # With biased bases, both bases are sampled separately and each
+        # sample needs at least MIN_BASIS_SAMPLE_SIZE bits, which usually
+        # makes the rarely chosen basis dominate the number of pairs. The
+        # other basis must hold the key on top of its sample.
+        basis_sifting_probabilities = sorted([
+            z_basis_probability**2,
+            (1 - z_basis_probability)**2,
+        ])
+        return max(
+            required_epr_pairs(MIN_BASIS_SAMPLE_SIZE, basis_sifting_probabilities[0]),
+            required_epr_pairs(key_length + MIN_BASIS_SAMPLE_SIZE, basis_sifting_probabilities[1]),
+        )
+
+    if mode == SAMPLED:
+        return required_epr_pairs(key_length + sample_size(), p)
+
+    if mode == CASCADE:
+        return required_epr_pairs(key_length, p)
+
+    # Generating three EPR pairs per key bit with unbiased bases leaves
+    # about half of the raw key for QBER estimation. Short keys need more
+    # pairs to leave any raw key for QBER estimation with high confidence.
+    return max(
+        int(np.ceil(key_length * 1.5 / p)),
+        required_epr_pairs(key_length + 1, p),
+    )
+
+def estimate_qber_per_basis(local_bits, remote_bits, bases):
+    """
+    Estimates the QBER separately for the bits measured in the Z basis (0)
+    and in the X basis (1).
+
+    Returns a list containing the number of errors and the number of bits
+    for each basis.
+    """
+    local_bits = np.asarray(local_bits)
+    remote_bits = np.asarray(remote_bits)
+    bases = np.asarray(bases)
+
+    basis_errors = []
+    for basis in (0, 1):
+        in_basis = bases == basis
+        num_errors = int(np.count_nonzero(local_bits[in_basis] != remote_bits[in_basis]))
+        basis_errors.append((num_errors, int(np.count_nonzero(in_basis))))
+
+    return basis_errors
+
+def exceeds_threshold(
+        basis_errors,
+        threshold=QBER_THRESHOLD,
+        min_sample_size=MIN_BASIS_SAMPLE_SIZE,
+):
+    """
+    Determines whether eavesdropping cannot be ruled out in some basis,
+    either because fewer than min_sample_size bits of the basis were
+    sampled, or because the upper bound on the QBER of the basis reaches
+    the threshold.
+    """
+    return any(
+        num_bits < min_sample_size or qber_upper_bound(num_errors, num_bits) >= threshold
+        for num_errors, num_bits in basis_errors
+    )
@@ -0,0 +1,206 @@
+import os
+import zlib
+
+from threading import Lock, current_thread, local
+
+import numpy as np
+
+# The number of bytes drawn from the operating system at a time.
+BUFFER_SIZE = 1 << 16
+
+# Uniform floats are built from the 53 most significant bits of a word.
+_FLOAT_BITS = 53
+
+class RandomnessPool:
+    """
+    Hands out cryptographically strong random bits, integers and
+    permutations in bulk, from a buffer which is refilled from the
+    operating system's CSPRNG (os.urandom).
+
+    The pool is shared by all threads of a process. A forked child process
+    discards the buffer of its parent, so that two processes never hand
+    out the same bytes, and gets a new lock, as the lock may have been
+    held by another thread of the parent at the time of the fork.
+
+    A pool created with a seed is not secure and is only meant for
+    reproducible test runs. Each thread then draws from its own stream,
+    derived from the seed, the name of the thread and the number of
+    threads of the same name which drew from the pool before it, so that
+    the bytes a thread gets do not depend on how threads are scheduled.
+    """
+
+    def __init__(self, buffer_size=BUFFER_SIZE, seed=None):
+        self._buffer_size = buffer_size
+        self._seed = seed
+        self._reinitialize()
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reinitialize)
+
+    def _reinitialize(self):
+        self._lock = Lock()
+        self._buffer = b""
+        self._position = 0
+
+        self._streams = local()
+        self._num_streams = {}
+
+    def _seeded_bytes(self, num_bytes):
+        stream = getattr(self._streams, "generator", None)
+
+        if stream is None:
+            name = current_thread().name
+            with self._lock:
+                stream_id = self._num_streams.get(name, 0)
+                self._num_streams[name] = stream_id + 1
+
+            stream = np.random.default_rng([self._seed, zlib.crc32(name.encode()), stream_id])
+            self._streams.generator = stream
+
+        return stream.bytes(num_bytes)
+
+    def random_bytes(self, num_bytes):
+        """
+        Returns an array of uniformly random bytes.
+        """
+        if self._seed is not None:
+            return np.frombuffer(self._seeded_bytes(num_bytes), dtype=np.uint8)
+
+        # Requests at least as large as the buffer are served directly.
+        if num_bytes >= self._buffer_size:
+            return np.frombuffer(os.urandom(num_bytes), dtype=np.uint8)
+
+        with self._lock:
+            if self._position + num_bytes > len(self._buffer):
+                self._buffer = os.urandom(self._buffer_size)
+                self._position = 0
+
+            data = self._buffer[self._position:self._position + num_bytes]
+            self._position += num_bytes
+
+        return np.frombuffer(data, dtype=np.uint8)
+
+    def random_words(self, num_words):
+        """
+        Returns an array of uniformly random 64-bit unsigned integers.
+        """
+        return self.random_bytes(8 * num_words).view(np.uint64)
+
+    def random_bits(self, num_bits):
+        """
+        Returns an array of uniformly random bits.
+        """
+        return np.unpackbits(self.random_bytes(-(-num_bits // 8)), count=num_bits)
+
+    def random_floats(self, num_floats):
+        """
+        Returns an array of uniformly random floats in [0, 1).
+        """
+        return (self.random_words(num_floats) >> np.uint64(64 - _FLOAT_BITS)) * 2.0**-_FLOAT_BITS
+
+    def random_integers(self, num_integers, upper):
+        """
+        Returns an array of uniformly random integers in [0, upper), for an
+        upper bound of at most 2^64.
+
+        Words beyond the largest multiple of the upper bound are rejected,
+        so that the modulo does not bias the result.
+        """
+        limit = (1 << 64) - (1 << 64) % upper
+        integers = np.zeros(0, dtype=np.uint64)
+
+        while len(integers) < num_integers:
+            words = self.random_words(num_integers - len(integers))
+            if limit < (1 << 64):
+                words = words[words < np.uint64(limit)]
+            integers = np.concatenate([integers, words % np.uint64(upper)])
+
+        return integers
+
+    def shuffler(self):
+        """
+        Returns a NumPy generator keyed with 128 bits from the pool, for
+        shuffles which are too large to draw from the pool directly. The
+        Philox generator is a counter-based generator built from a block
+        cipher, so that each key yields an independent stream.
+        """
+        key = int.from_bytes(self.random_bytes(16).tobytes(), "little")
+        return np.random.Generator(np.random.Philox(key=key))
+
+    def permutation(self, size):
+        """
+        Returns a uniformly random permutation of range(size), by a
+        Fisher-Yates shuffle driven by a generator keyed from the pool.
+        """
+        return self.shuffler().permutation(size)
+
+    def sample(self, population_size, sample_size):
+        """
+        Returns the indices of a uniformly random subset of sample_size
+        elements out of range(population_size), in random order.
+
+        Samples of up to half the population are drawn by rejection: random
+        indices are drawn from the pool, and repeated indices are dropped,
+        which takes time proportional to the sample size. Larger samples
+        are taken from a random permutation of the population.
+        """
+        if not 0 <= sample_size <= population_size:
+            raise ValueError("Sample larger than population or is negative")
+
+        if 2 * sample_size > population_size:
+            return self.permutation(population_size)[:sample_size]
+
+        indices = np.zeros(0, dtype=np.int64)
+
+        while len(indices) < sample_size:
+            # Keeping the first occurrence of every index in the order
+            # drawn. At least half of the new indices are expected to be
+            # distinct from those already drawn.
+            candidates = np.concatenate([
+                indices,
+                self.random_integers(sample_size - len(indices), population_size).astype(np.int64),
+            ])
+            _, first_occurrences = np.unique(candidates, return_index=True)
+            indices = candidates[np.sort(first_occurrences)]
+
+        return indices
+
+# The pool shared by the applications.
+_pool = RandomnessPool()
+
+def seed(seed):
+    """
+    Replaces the pool shared by the applications with a pool seeded with
+    the given seed, which makes local runs reproducible, or with a secure
+    pool again if the seed is None.
+    """
+    global _pool
+    _pool = RandomnessPool(seed=seed)
+
+def random_bases(num_bases, z_basis_probability=0.5):
+    """
+    Returns an array of measurement bases, each of which is the Z basis (0)
+    with the given probability and the X basis (1) otherwise.
+    """
+    if z_basis_probability == 0.5:
+        return _pool.random_bits(num_bases)
+    return (_pool.random_floats(num_bases) >= z_basis_probability).astype(np.uint8)
+
+def random_integers(num_integers, upper):
+    """
+    Returns an array of uniformly random integers in [0, upper).
+    """
+    return _pool.random_integers(num_integers, upper)
+
+def permutation(size):
+    """
+    Returns a uniformly random permutation of range(size).
+    """
+    return _pool.permutation(size)
+
+def sample(population_size, sample_size):
+    """
+    Returns the indices of a uniformly random subset of sample_size
+    elements out of range(population_size).
+    """
+    return _pool.sample(population_size, sample_size)
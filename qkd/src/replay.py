@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import time
+
+import bbm92
+import local_backend
+import transcript
+
+def replay(transcript_dir, **params):
+    """
+    Replays the transcripts recorded by the applications in a directory,
+    running the applications on the local backend with the measurements of
+    the quantum stage read from the transcripts instead of being simulated.
+
+    The parameters must be those of the recorded run, so that every quantum
+    stage asks for the recorded number of EPR pairs.
+
+    Arguments:
+
+    transcript_dir - The directory containing the transcript of each role.
+    params - The application parameters, as in application.json.
+
+    Returns:
+
+    results - A dictionary containing the result of each role.
+    """
+    transcripts = {
+        role: transcript.read_transcript(transcript.transcript_path(transcript_dir, role))
+        for role in local_backend.APP_MODULES
+        if os.path.exists(transcript.transcript_path(transcript_dir, role))
+    }
+
+    def replay_key_material_on_sockets(conn, epr_sockets, num_epr_pairs, **kwargs):
+        records = [next(transcripts[conn.app_name]) for _ in epr_sockets]
+
+        for measurements, _ in records:
+            if len(measurements) != num_epr_pairs:
+                raise ValueError(
+                    f"Transcript of {conn.app_name} holds {len(measurements)} EPR pairs "
+                    f"instead of {num_epr_pairs}, replay with the recorded parameters"
+                )
+
+        return records
+
+    # The applications measure through bbm92, which is pointed to the
+    # transcripts for the duration of the replay. Recording is disabled, so
+    # that the transcripts being read are not overwritten.
+    measure_key_material_on_sockets = bbm92.measure_key_material_on_sockets
+    bbm92.measure_key_material_on_sockets = replay_key_material_on_sockets
+    recording_dir = os.environ.pop(transcript.TRANSCRIPT_DIR_VARIABLE, None)
+
+    try:
+        return local_backend.run_local(**params)
+    finally:
+        bbm92.measure_key_material_on_sockets = measure_key_material_on_sockets
+        if recording_dir is not None:
+            os.environ[transcript.TRANSCRIPT_DIR_VARIABLE] = recording_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replays recorded measurement transcripts through post-processing.",
+    )
+    parser.add_argument("transcript_dir")
+    parser.add_argument(
+        "--params",
+        type=json.loads,
+        default={},
+        help="the application parameters of the recorded run, as a JSON object",
+    )
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    results = replay(args.transcript_dir, **args.params)
+    elapsed_time = time.perf_counter() - start_time
+
+    for role, result in results.items():
+        secret_key = result["secret_key"]
+        print(
+            f"{role} :: " +
+            (f"{len(secret_key)} secret bits" if secret_key is not None else "no secret key") +
+            f" :: QBER {result['qber']}"
+        )
+    print(f"Replayed in {elapsed_time:.3f} s")
@@ -0,0 +1,306 @@
+import logging
+import os
+import time
+
+from functools import partial
+
+from netqasm.logging.glob import get_netqasm_logger
+from netqasm.sdk.external import NetQASMConnection, Socket
+
+from epr_socket import DerivedEPRSocket as EPRSocket
+
+from key_store import DEFAULT_CAPACITY, KeyStore, store_key_synchronized
+
+import bbm92
+import key_encoding
+import pipeline
+import profiling
+import qber_estimation
+import sessions
+import topology as topology_config
+import transcript
+
+logger = get_netqasm_logger()
+
+def run_node(
+        role,
+        app_config,
+        eavesdropper=False,
+        key_length=16,
+        num_keys=1,
+        cascade_workers=1,
+        qber_mode=0,
+        z_basis_probability=0.5,
+        multi_party=0,
+        num_sessions=1,
+        reconciliation_mode=0,
+        window_size=0,
+        compact_keys=0,
+        profile=0,
+):
+    """
+    Runs the application of the given role, which the applications of all
+    roles call with their parameters.
+
+    The role negotiates keys with its neighbours in the topology given by
+    the network and application configuration: the hub creates EPR pairs
+    with every peer and runs Alice's side of the protocol, while each peer
+    receives EPR pairs from the hub and runs Bob's side. The hub then
+    relays keys along the relay routes of the topology.
+
+    Returns the result of the role, which holds the secret key, or None if
+    no key was established or the role takes no part in the run.
+    """
+    topology = topology_config.load_topology(int(multi_party))
+    neighbours = topology.neighbours(role)
+
+    # Roles which only take part in the multi-party mode have nothing to
+    # do otherwise.
+    if not neighbours:
+        return {
+            "secret_key": None,
+        }
+
+    # Ensuring that logs can be visualized following experiment.
+    fileHandler = logging.FileHandler(f"{role}_logfile.log")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(fileHandler)
+
+    is_hub = role == topology.hub
+
+    # Several independent sessions can be run with each neighbour at the
+    # same time, each with its own EPR socket id and classical socket id.
+    num_sessions = int(num_sessions)
+    links = [(neighbour, session_id) for neighbour in neighbours for session_id in range(num_sessions)]
+
+    # Sockets for classical communication
+    sockets = [
+        Socket(role, neighbour, socket_id=session_id, log_config=app_config.log_config)
+        for neighbour, session_id in links
+    ]
+    # Sockets for EPR generation
+    epr_sockets = [
+        EPRSocket(
+            neighbour,
+            epr_socket_id=session_id,
+            remote_epr_socket_id=session_id,
+            eavesdrop=eavesdropper,
+        )
+        for neighbour, session_id in links
+    ]
+
+    conn = NetQASMConnection(
+        app_name=app_config.app_name,
+        log_config=app_config.log_config,
+        epr_sockets=epr_sockets,
+    )
+
+    # Reconciled keys are appended to a persistent key store when a key
+    # store directory is configured. The store is kept in sync between the
+    # hub and its first peer. The capacity only applies to new stores.
+    key_store = None
+    key_store_dir = os.environ.get("QKD_KEY_STORE")
+    if key_store_dir and role in (topology.hub, topology.peers[0]):
+        key_store = KeyStore(
+            os.path.join(key_store_dir, f"{role}.keys"),
+            capacity=int(os.environ.get("QKD_KEY_STORE_CAPACITY", DEFAULT_CAPACITY)),
+        )
+
+    # The measurements of the quantum stage are recorded to a transcript
+    # when a transcript directory is configured, so that post-processing
+    # can be replayed without the quantum simulation.
+    transcript_writer = None
+    transcript_dir = os.environ.get(transcript.TRANSCRIPT_DIR_VARIABLE)
+    if transcript_dir:
+        transcript_writer = transcript.TranscriptWriter(
+            transcript.transcript_path(transcript_dir, role),
+        )
+
+    # The phases of the protocol are profiled when profiling is enabled,
+    # either in application.json or through the environment. The profiles
+    # are written next to the log file.
+    profiler = None
+    if profiling.profiling_enabled(profile):
+        profiler = profiling.PhaseProfiler(f"{role}_profile")
+
+    num_keys = int(num_keys)
+    qber_mode = int(qber_mode)
+    z_basis_probability = float(z_basis_probability)
+    post_process_fn = bbm92.alice_post_process if is_hub else bbm92.bob_post_process
+
+    # Long keys are generated in windows of window_size bits, or of
+    # pipeline.MAX_WINDOW_SIZE bits if none is set, each of which goes
+    # through all stages of the protocol on its own, so that memory is
+    # bounded by the window size.
+    windows = pipeline.split_into_windows(key_length, int(window_size))
+
+    def quantum_stage(window_key_length):
+        session_key_lengths = sessions.split_key_length(window_key_length, num_sessions)
+        num_epr_pairs = qber_estimation.num_epr_pairs(
+            session_key_lengths[0],
+            qber_mode,
+            z_basis_probability,
+        )
+
+        # Generating or receiving EPR pairs and measuring them in random
+        # bases, for all sessions with all neighbours at the same time.
+        with profiling.phase(profiler, "measurement"):
+            measurement_results = bbm92.measure_key_material_on_sockets(
+                conn,
+                epr_sockets,
+                num_epr_pairs,
+                create_epr=is_hub,
+                z_basis_probability=z_basis_probability,
+            )
+
+        if transcript_writer is not None:
+            for measurements, measurement_bases in measurement_results:
+                transcript_writer.write(measurements, measurement_bases)
+
+        return measurement_results
+
+    def post_process(socket, measurement_results, session_key_length):
+        measurements, measurement_bases = measurement_results
+        return post_process_fn(
+            socket,
+            measurements,
+            measurement_bases,
+            session_key_length,
+            num_workers=int(cascade_workers),
+            qber_estimation_mode=qber_mode,
+            z_basis_probability=z_basis_probability,
+            reconciliation_mode=int(reconciliation_mode),
+            profiler=profiler,
+        )
+
+    def classical_stage(window_key_length, measurement_results):
+        session_key_lengths = sessions.split_key_length(window_key_length, num_sessions)
+
+        # Post-processing the keys of all sessions with all neighbours at
+        # the same time.
+        session_key_results = sessions.run_concurrently([
+            partial(
+                post_process,
+                socket,
+                session_measurement_results,
+                session_key_lengths[session_id],
+            )
+            for socket, session_measurement_results, (_, session_id) in zip(
+                sockets,
+                measurement_results,
+                links,
+            )
+        ])
+
+        # Combining the keys of all sessions with the same neighbour.
+        neighbour_key_results = {
+            neighbour: sessions.combine_key_results(
+                session_key_results[i * num_sessions:(i + 1) * num_sessions]
+            )
+            for i, neighbour in enumerate(neighbours)
+        }
+        neighbour_sockets = {
+            neighbour: sockets[i * num_sessions] for i, neighbour in enumerate(neighbours)
+        }
+        key_result = neighbour_key_results[neighbours[0]]
+
+        if is_hub:
+            # Acting as a trusted node, keys are relayed along the relay
+            # routes, so that both ends of a route share a key.
+            peer_keys = {
+                neighbour: neighbour_key_result["secret_key"]
+                for neighbour, neighbour_key_result in neighbour_key_results.items()
+            }
+
+            for source, destination in topology.relay_routes:
+                relayed = sessions.relay_key(
+                    peer_keys[source],
+                    peer_keys[destination],
+                    neighbour_sockets[destination],
+                )
+
+                # The key shared with the destination has been used up as a
+                # one-time pad, so it is not reported as a secret key.
+                if relayed:
+                    peer_keys[destination] = None
+
+            if len(neighbours) > 1:
+                key_result["peer_keys"] = peer_keys
+        elif topology.relay_source(role) is not None:
+            # Receiving the key shared with the source of the relay route,
+            # relayed by the hub. The key shared with the hub has been used
+            # up as a one-time pad, so it is not reported as a secret key.
+            key_result["relayed_key"] = sessions.receive_relayed_key(
+                key_result["secret_key"],
+                sockets[0],
+            )
+
+            if key_result["relayed_key"] is not None:
+                key_result["secret_key"] = None
+
+        if key_store is not None:
+            key_id = store_key_synchronized(
+                key_store,
+                key_result["secret_key"],
+                sockets[0],
+            )
+
+            if key_id is None:
+                logger.info(
+                    f"Key not stored, as a party holds no key or its key store is full "
+                    f"({key_store.free} of {key_store.capacity} bits free)"
+                )
+            else:
+                logger.info(f"Stored key with identifier {key_id}")
+
+        return key_result
+
+    with conn:
+        start_time = time.perf_counter()
+
+        # In continuous mode, the EPR pairs for the next key or window are
+        # generated while the current one is being post-processed. The
+        # windows of each key are packed into its key as they are
+        # reconciled.
+        key_results = list(sessions.combine_windows(
+            pipeline.stream_pipelined(
+                quantum_stage,
+                classical_stage,
+                [window_key_length for _ in range(num_keys) for window_key_length in windows],
+            ),
+            windows,
+        ))
+
+        elapsed_time = time.perf_counter() - start_time
+
+    if key_store is not None:
+        key_store.close()
+
+    if transcript_writer is not None:
+        transcript_writer.close()
+
+    if profiler is not None:
+        profiler.close()
+
+    secret_keys = [key_result["secret_key"] for key_result in key_results]
+    secret_bits = sum(len(key) for key in secret_keys if key is not None)
+    logger.info(
+        f"Generated {secret_bits} secret bits in {elapsed_time:.3f} s "
+        f"({secret_bits / elapsed_time:.1f} bits/s)"
+    )
+
+    # The result of the first key is reported as the round result.
+    result = dict(key_results[0])
+
+    if num_keys > 1:
+        result["secret_keys"] = secret_keys
+
+    # Long keys are reported in a compact encoding, to keep result files
+    # small. Otherwise, keys combined from windows are expanded into lists
+    # of bits.
+    if int(compact_keys):
+        result = key_encoding.encode_key_result(result)
+    else:
+        result = key_encoding.expand_key_result(result)
+
+    return result
@@ -0,0 +1,208 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import current_thread
+
+import numpy as np
+
+import key_encoding
+
+def run_concurrently(fns):
+    """
+    Runs the given functions without arguments at the same time, one per
+    thread, and returns their results in order.
+
+    This is used to run the classical stages of several BBM92 sessions,
+    each of which spends most of its time waiting on its own socket.
+    """
+    if len(fns) == 1:
+        return [fns[0]()]
+
+    # The threads are named after the calling thread, which names the role
+    # they run for.
+    with ThreadPoolExecutor(
+            max_workers=len(fns),
+            thread_name_prefix=current_thread().name,
+    ) as executor:
+        futures = [executor.submit(fn) for fn in fns]
+        return [future.result() for future in futures]
+
+def split_key_length(key_length, num_sessions):
+    """
+    Splits a key length across several sessions, whose keys are combined
+    into a key of the full length.
+    """
+    return [
+        key_length // num_sessions + (1 if i < key_length % num_sessions else 0)
+        for i in range(num_sessions)
+    ]
+
+def combine_key_results(key_results):
+    """
+    Combines the results of several sessions with the same peer into a
+    single result by concatenating their keys. The combined key is None if
+    any of the sessions failed to establish a key. Sessions without a QBER
+    estimate, which ended before sampling, are left out of the QBER.
+    """
+    if len(key_results) == 1:
+        return key_results[0]
+
+    secret_keys = [key_result["secret_key"] for key_result in key_results]
+
+    secret_key = None
+    if all(key is not None for key in secret_keys):
+        secret_key = np.concatenate([np.asarray(key, dtype=int) for key in secret_keys]).tolist()
+
+    estimated_results = [
+        key_result for key_result in key_results if key_result["qber"] is not None
+    ]
+
+    qber = None
+    qber_upper_bound = None
+    if estimated_results:
+        qber = float(np.mean([key_result["qber"] for key_result in estimated_results]))
+        qber_upper_bound = max(key_result["qber_upper_bound"] for key_result in estimated_results)
+
+    return {
+        "secret_key": secret_key,
+        "leaked_bits": sum(key_result["leaked_bits"] for key_result in key_results),
+        "qber": qber,
+        "qber_upper_bound": qber_upper_bound,
+        "session_results": key_results,
+    }
+
+def _result_keys(key_result):
+    """
+    Returns the keys of a result, along with their path in the result: the
+    secret key, the relayed key and the key of each peer in multi-party mode.
+    """
+    keys = [(("secret_key",), key_result["secret_key"])]
+
+    if "relayed_key" in key_result:
+        keys.append((("relayed_key",), key_result["relayed_key"]))
+
+    for peer, peer_key in key_result.get("peer_keys", {}).items():
+        keys.append((("peer_keys", peer), peer_key))
+
+    return keys
+
+class _CombinedWindows:
+    """
+    The result of a key whose windows are being combined. The bits of each
+    window are packed into the keys of the result as the window arrives,
+    and only running totals are kept of the other fields.
+    """
+
+    def __init__(self, first_window_result, key_length):
+        self._keys = {
+            path: key_encoding.PackedKey(key_length)
+            for path, _ in _result_keys(first_window_result)
+        }
+        self._leaked_bits = 0
+        self._qbers = []
+        self._qber_upper_bound = None
+
+    def add(self, window_result):
+        for path, key in _result_keys(window_result):
+            # A key is discarded if any of its windows failed.
+            if key is None:
+                self._keys[path] = None
+            elif self._keys[path] is not None:
+                self._keys[path].append(key)
+
+        self._leaked_bits += window_result["leaked_bits"]
+
+        if window_result["qber"] is not None:
+            self._qbers.append(window_result["qber"])
+            self._qber_upper_bound = max(
+                window_result["qber_upper_bound"],
+                self._qber_upper_bound or 0.0,
+            )
+
+    def result(self):
+        combined_result = {
+            "secret_key": self._keys[("secret_key",)],
+            "leaked_bits": self._leaked_bits,
+            "qber": float(np.mean(self._qbers)) if self._qbers else None,
+            "qber_upper_bound": self._qber_upper_bound,
+        }
+
+        for path, key in self._keys.items():
+            if path[0] == "relayed_key":
+                combined_result["relayed_key"] = key
+            elif path[0] == "peer_keys":
+                combined_result.setdefault("peer_keys", {})[path[1]] = key
+
+        return combined_result
+
+def combine_windows(window_results, window_key_lengths):
+    """
+    Combines a stream of window results, as yielded by
+    pipeline.stream_pipelined, into the result of each key by concatenating
+    their keys, including the relayed key and peer keys in multi-party mode.
+    A key is None if any of its windows failed, and windows without a QBER
+    estimate are left out of the QBER, as in combine_key_results.
+
+    The keys of the combined results are key_encoding.PackedKey objects,
+    into which the bits of each window are packed as soon as the window
+    arrives, so that long keys are never held as lists of bits. Keys made
+    of a single window are passed through as they are.
+
+    Arguments:
+
+    window_results - An iterable of the results of all windows of all keys,
+        in order.
+    window_key_lengths - A list containing the length of each window of a
+        key.
+
+    Yields:
+
+    key_result - The combined result of each key.
+    """
+    if len(window_key_lengths) == 1:
+        yield from window_results
+        return
+
+    combined_windows = None
+    num_windows = 0
+
+    for window_result in window_results:
+        if combined_windows is None:
+            combined_windows = _CombinedWindows(window_result, sum(window_key_lengths))
+
+        combined_windows.add(window_result)
+        num_windows += 1
+
+        if num_windows == len(window_key_lengths):
+            yield combined_windows.result()
+            combined_windows = None
+            num_windows = 0
+
+def relay_key(source_key, peer_key, socket):
+    """
+    Relays a key to a peer as a trusted node, by sending it encrypted with
+    the one-time pad given by the key shared with that peer.
+
+    Returns whether the key was relayed, in which case the key shared with
+    the peer has been used up as a one-time pad and must not be used again.
+    """
+    if source_key is None or peer_key is None or len(source_key) != len(peer_key):
+        socket.send("NONE")
+        return False
+
+    relayed_bits = [str(a ^ b) for a, b in zip(source_key, peer_key)]
+    socket.send("".join(relayed_bits))
+    return True
+
+def receive_relayed_key(key, socket):
+    """
+    Receives a key relayed by a trusted node, decrypting it with the key
+    shared with that node. Once a key has been relayed, the key shared with
+    the node has been used up as a one-time pad and must not be used again.
+
+    Returns the relayed key, or None if no key could be relayed.
+    """
+    message = socket.recv()
+
+    if message == "NONE" or key is None:
+        return None
+
+    return [int(bit) ^ k for bit, k in zip(message, key)]
@@ -2,6 +2,8 @@ import unittest
 
 from unittest.mock import MagicMock
 
+import numpy as np
+
 import cascade
 
 class FakeSocket():
@@ -70,5 +72,148 @@ class TestCascade(unittest.TestCase):
         )
         self.assertEqual(result.tolist(), [0, 1, 1])
 
+    def test_client_cascade(self):
+        rng = np.random.default_rng(3)
+        correct_key = rng.integers(0, 2, 512)
+
+        noisy_key = correct_key.copy()
+        noisy_key[[5, 100, 250, 400]] ^= 1
+
+        def ask_parity(block_indices):
+            return cascade.get_block_parity_from_indices(correct_key, block_indices)
+
+        corrected_key = cascade.client_cascade(noisy_key, 0.01, ask_parity)
+        self.assertEqual(corrected_key.tolist(), correct_key.tolist())
+
+    def test_batched_binary_algorithm(self):
+        correct_key = np.zeros(16, dtype=int)
+        noisy_key = correct_key.copy()
+        noisy_key[[2, 13]] = 1
+
+        channel = MagicMock()
+        channel.ask_parities.side_effect = lambda blocks: [
+            cascade.get_block_parity_from_indices(correct_key, b) for b in blocks
+        ]
+
+        blocks = [np.arange(0, 8), np.arange(8, 16)]
+        cascade.batched_binary_algorithm(noisy_key, blocks, channel)
+
+        self.assertEqual(noisy_key.tolist(), correct_key.tolist())
+
+        # Both blocks are bisected in lockstep, taking one round per level.
+        self.assertEqual(channel.ask_parities.call_count, 3)
+
+    def test_client_cascade_batch(self):
+        rng = np.random.default_rng(5)
+        correct_keys = [rng.integers(0, 2, 16) for _ in range(8)]
+        correct_key = np.concatenate(correct_keys)
+
+        # Flipping a single bit in every key.
+        noisy_keys = [key.copy() for key in correct_keys]
+        for i, noisy_key in enumerate(noisy_keys):
+            noisy_key[i] ^= 1
+
+        channel = MagicMock()
+        channel.ask_parities.side_effect = lambda blocks: [
+            cascade.get_block_parity_from_indices(correct_key, b) for b in blocks
+        ]
+
+        corrected_keys = cascade.client_cascade_batch(noisy_keys, [0.1] * 8, channel)
+        self.assertEqual(
+            [key.tolist() for key in corrected_keys],
+            [key.tolist() for key in correct_keys],
+        )
+
+        # Blocks never span more than one key.
+        for call in channel.ask_parities.call_args_list:
+            for block_indices in call.args[0]:
+                self.assertEqual(len({i // 16 for i in block_indices}), 1)
+
+        # The keys are reconciled in lockstep, taking as many rounds as a
+        # single key: one per pass plus one per level of bisection.
+        self.assertLessEqual(channel.ask_parities.call_count, 3 + 3 * 4)
+
+    def test_listen_and_respond_block_parity_batch(self):
+        keys = [[0, 1, 0], [1, 1, 0]]
+
+        socket = FakeSocket()
+
+        socket.recv = MagicMock()
+        socket.recv.side_effect = ["0#1,2", "1#3,4", "STOP"]
+
+        socket.send = MagicMock()
+
+        leaked_bits = cascade.listen_and_respond_block_parity_batch(keys, socket)
+        self.assertEqual(
+            [c.args[0] for c in socket.send.call_args_list],
+            ["0#1", "1#0"],
+        )
+        self.assertEqual(leaked_bits, 2)
+
+    def test_listen_and_respond_tagged_block_parity(self):
+        key = [0, 1, 0, 1, 1, 0]
+
+        socket = FakeSocket()
+
+        socket.recv = MagicMock()
+        socket.recv.side_effect = ["0#3,1,5", "1#1,3,4", "STOP"]
+
+        socket.send = MagicMock()
+
+        cascade.listen_and_respond_block_parity(key, socket)
+        self.assertEqual(
+            [c.args[0] for c in socket.send.call_args_list],
+            ["0#0", "1#1"],
+        )
+
+    def test_segment_bounds(self):
+        self.assertEqual(cascade.get_segment_bounds(100, 4), [(0, 100)])
+
+        bounds = cascade.get_segment_bounds(1024, 4)
+        self.assertEqual(bounds, [(0, 256), (256, 512), (512, 768), (768, 1024)])
+
+        bounds = cascade.get_segment_bounds(1000, 8)
+        self.assertEqual(len(bounds), 3)
+        self.assertEqual(bounds[-1][1], 1000)
+
+    def test_client_cascade_segmented(self):
+        rng = np.random.default_rng(7)
+        correct_key = rng.integers(0, 2, 1024)
+        segment_bounds = cascade.get_segment_bounds(len(correct_key), 4)
+
+        # Flipping a single bit in every segment.
+        noisy_key = correct_key.copy()
+        for start, _ in segment_bounds:
+            noisy_key[start + 3] ^= 1
+
+        def ask_segment_parity(segment_id, block_indices):
+            start = segment_bounds[segment_id][0]
+            indices = [start + i for i in block_indices]
+            return cascade.get_block_parity_from_indices(correct_key, indices)
+
+        corrected_key = cascade.client_cascade_segmented(
+            noisy_key,
+            0.01,
+            ask_segment_parity,
+            num_workers=4,
+        )
+        self.assertEqual(corrected_key.tolist(), correct_key.tolist())
+
+    def test_listen_and_respond_segment_parity(self):
+        key = [0] * 256 + [1] * 256
+
+        socket = FakeSocket()
+
+        socket.recv = MagicMock()
+        socket.recv.side_effect = ["0|0,1,2", "1|0,1,2", "STOP"]
+
+        socket.send = MagicMock()
+
+        cascade.listen_and_respond_segment_parity(key, 2, socket)
+        self.assertEqual(
+            [c.args[0] for c in socket.send.call_args_list],
+            ["0", "1"],
+        )
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from unittest.mock import MagicMock
+
+import key_confirmation
+
+class TestKeyConfirmation(unittest.TestCase):
+    def test_polynomial_hash(self):
+        key = [0, 1, 1, 0, 1, 0, 0, 1] * 9
+        point = 123456789
+
+        key_hash = key_confirmation.polynomial_hash(key, point)
+        self.assertEqual(key_hash, key_confirmation.polynomial_hash(list(key), point))
+        self.assertLess(key_hash, 2**key_confirmation.TAG_BITS)
+
+        # Flipping any single bit changes the hash.
+        for i in range(len(key)):
+            flipped_key = list(key)
+            flipped_key[i] ^= 1
+            self.assertNotEqual(
+                key_confirmation.polynomial_hash(flipped_key, point),
+                key_hash,
+            )
+
+    def test_polynomial_hash_depends_on_length(self):
+        point = 987654321
+        self.assertNotEqual(
+            key_confirmation.polynomial_hash([1, 0], point),
+            key_confirmation.polynomial_hash([1, 0, 0], point),
+        )
+
+    def test_confirmation_exchange(self):
+        key = [1, 0, 1, 1, 0]
+
+        bob_socket = MagicMock()
+        bob_socket.recv.return_value = "1"
+        self.assertTrue(key_confirmation.confirm_key(key, bob_socket))
+        message = bob_socket.send.call_args.args[0]
+
+        # Alice confirms the key when hers is identical.
+        alice_socket = MagicMock()
+        alice_socket.recv.return_value = message
+        self.assertTrue(key_confirmation.respond_key_confirmation(key, alice_socket))
+        alice_socket.send.assert_called_with("1")
+
+        # Alice rejects the key when hers differs.
+        alice_socket = MagicMock()
+        alice_socket.recv.return_value = message
+        self.assertFalse(
+            key_confirmation.respond_key_confirmation([1, 0, 1, 1, 1], alice_socket)
+        )
+        alice_socket.send.assert_called_with("0")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+import key_encoding
+
+class TestKeyEncoding(unittest.TestCase):
+    def test_encode_key(self):
+        key = [1, 0, 1, 1, 0, 0, 0, 1, 1, 1]
+        encoded_key = key_encoding.encode_key(key)
+
+        self.assertEqual(encoded_key["length"], 10)
+        self.assertEqual(key_encoding.decode_key(encoded_key), key)
+
+        # Keys which only differ in trailing zeros have different hashes.
+        self.assertNotEqual(
+            key_encoding.encode_key(key + [0])["sha256"],
+            encoded_key["sha256"],
+        )
+
+        self.assertIsNone(key_encoding.encode_key(None))
+
+    def test_packed_key(self):
+        key = [1, 0, 1, 1, 0, 0, 0, 1, 1, 1]
+
+        # Appending windows which do not end on a byte boundary.
+        packed_key = key_encoding.PackedKey(len(key))
+        packed_key.append(key[:3])
+        packed_key.append(key[3:9])
+        packed_key.append(key[9:])
+
+        self.assertEqual(len(packed_key), len(key))
+        self.assertEqual(packed_key.tolist(), key)
+        self.assertEqual(key_encoding.encode_key(packed_key), key_encoding.encode_key(key))
+
+        with self.assertRaises(ValueError):
+            packed_key.append([0])
+
+        result = key_encoding.expand_key_result({"secret_key": packed_key, "qber": 0.1})
+        self.assertEqual(result["secret_key"], key)
+
+    def test_encode_key_result(self):
+        result = {
+            "secret_key": [0, 1],
+            "secret_keys": [[0, 1], None],
+            "peer_keys": {"bob": [0, 1]},
+            "qber": 0.1,
+        }
+
+        encoded_result = key_encoding.encode_key_result(result)
+        self.assertEqual(encoded_result["secret_key"]["length"], 2)
+        self.assertIsNone(encoded_result["secret_keys"][1])
+        self.assertEqual(encoded_result["peer_keys"]["bob"], encoded_result["secret_key"])
+        self.assertEqual(encoded_result["qber"], 0.1)
+
+        # The original result is left as it is.
+        self.assertEqual(result["secret_key"], [0, 1])
+
+if __name__ == "__main__":
+    unittest.main()
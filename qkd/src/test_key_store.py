@@ -0,0 +1,143 @@
+import os
+import tempfile
+import unittest
+
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from key_store import KeyStore, store_key_synchronized
+
+class TestKeyStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test.keys")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_append_and_take(self):
+        with KeyStore(self.path, capacity=16) as key_store:
+            self.assertEqual(key_store.append([0, 1, 1, 0]), 0)
+            self.assertEqual(key_store.append([1, 1, 0]), 1)
+            self.assertEqual(key_store.available, 7)
+
+            self.assertEqual(key_store.take(5).tolist(), [0, 1, 1, 0, 1])
+            self.assertEqual(key_store.take(2).tolist(), [1, 0])
+            self.assertEqual(key_store.available, 0)
+
+    def test_take_returns_view_of_mapped_file(self):
+        with KeyStore(self.path, capacity=16) as key_store:
+            key_store.append([1, 0, 1])
+            bits = key_store.take(3)
+            self.assertIsInstance(bits.base, np.memmap)
+
+    def test_wrap_around(self):
+        with KeyStore(self.path, capacity=8) as key_store:
+            key_store.append([1, 1, 1, 1, 1, 1])
+            key_store.take(6)
+            key_store.release(6)
+            key_store.append([0, 1, 0, 1, 0])
+            self.assertEqual(key_store.take(5).tolist(), [0, 1, 0, 1, 0])
+
+    def test_overflow_and_underflow(self):
+        with KeyStore(self.path, capacity=4) as key_store:
+            key_store.append([1, 0, 1])
+
+            with self.assertRaises(RuntimeError):
+                key_store.append([0, 0])
+
+            with self.assertRaises(RuntimeError):
+                key_store.take(4)
+
+    def test_persistence(self):
+        with KeyStore(self.path, capacity=16) as key_store:
+            key_store.append([1, 0, 0, 1])
+            key_store.take(1)
+
+        with KeyStore(self.path) as key_store:
+            self.assertEqual(key_store.capacity, 16)
+            self.assertEqual(key_store.next_key_id, 1)
+            self.assertEqual(key_store.take(3).tolist(), [0, 0, 1])
+
+    def test_out_of_sync_key_id(self):
+        with KeyStore(self.path, capacity=16) as key_store:
+            with self.assertRaises(RuntimeError):
+                key_store.append([1, 0], key_id=3)
+
+    def test_release_zeroes_and_frees_taken_bits(self):
+        with KeyStore(self.path, capacity=4) as key_store:
+            key_store.append([1, 1, 1, 1])
+            bits = key_store.take(3)
+
+            # Taken bits are not overwritten until they are released.
+            with self.assertRaises(RuntimeError):
+                key_store.append([0, 0])
+            self.assertEqual(bits.tolist(), [1, 1, 1])
+
+            key_store.release(3)
+            self.assertEqual(bits.tolist(), [0, 0, 0])
+            self.assertEqual(key_store.taken, 0)
+
+            key_store.append([0, 1, 0])
+            self.assertEqual(key_store.take(4).tolist(), [1, 0, 1, 0])
+
+            with self.assertRaises(RuntimeError):
+                key_store.release(5)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\x01" * 64)
+
+        with self.assertRaises(ValueError):
+            KeyStore(self.path)
+
+    def test_store_key_synchronized(self):
+        socket = MagicMock()
+        socket.recv.side_effect = ["0:1"]
+
+        with KeyStore(self.path, capacity=16) as key_store:
+            key_id = store_key_synchronized(key_store, [1, 0], socket)
+            self.assertEqual(key_id, 0)
+            socket.send.assert_called_with("0:1")
+
+            # The key is not stored when the other party discarded it.
+            socket.recv.side_effect = ["1:0"]
+            key_id = store_key_synchronized(key_store, [1, 1], socket)
+            self.assertIsNone(key_id)
+            self.assertEqual(key_store.available, 2)
+
+    def test_store_key_synchronized_when_full(self):
+        socket = MagicMock()
+        socket.recv.side_effect = ["0:1"]
+
+        with KeyStore(self.path, capacity=4) as key_store:
+            key_store.append([1, 0, 1])
+
+            # A key which does not fit is skipped rather than failing, and
+            # the other party is told not to store it either.
+            socket.recv.side_effect = ["1:1"]
+            self.assertIsNone(store_key_synchronized(key_store, [1, 1], socket))
+            socket.send.assert_called_with("1:0")
+            self.assertEqual(key_store.next_key_id, 1)
+
+            # Nor is a key stored when the other party's store is full.
+            socket.recv.side_effect = ["1:0"]
+            self.assertIsNone(store_key_synchronized(key_store, [1], socket))
+            socket.send.assert_called_with("1:1")
+            self.assertEqual(key_store.free, 1)
+
+    def test_store_key_synchronized_out_of_sync(self):
+        socket = MagicMock()
+        socket.recv.side_effect = ["3:1"]
+
+        with KeyStore(self.path, capacity=16) as key_store:
+            with self.assertRaises(RuntimeError):
+                store_key_synchronized(key_store, [1, 0], socket)
+
+            # The identifiers are announced before anything is stored.
+            socket.send.assert_called_with("0:1")
+            self.assertEqual(key_store.available, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+
+from unittest.mock import patch
+
+import numpy as np
+
+import local_backend
+
+from key_store import KeyStore
+
+class TestLocalBackend(unittest.TestCase):
+    def setUp(self):
+        # The applications write their log files to the working directory.
+        self._working_directory = os.getcwd()
+        self._log_directory = tempfile.TemporaryDirectory()
+        os.chdir(self._log_directory.name)
+
+    def tearDown(self):
+        os.chdir(self._working_directory)
+        self._log_directory.cleanup()
+
+    def _measure_pairs(self, link, num_pairs):
+        alice_outcomes = np.array([link.next_pair(0) for _ in range(num_pairs)])
+        bob_outcomes = np.array([link.next_pair(1) for _ in range(num_pairs)])
+        return np.mean(alice_outcomes != bob_outcomes, axis=0)
+
+    def test_link_error_rates(self):
+        network = local_backend.LocalNetwork(fidelity=0.85, seed=1)
+        link = network.link(("alice", 0), ("bob", 0))
+
+        # Two of the three other Bell states flip the outcomes in each
+        # basis, so the error rate is 2 / 3 * (1 - F) = 10%.
+        error_rates = self._measure_pairs(link, 20000)
+        np.testing.assert_allclose(error_rates, [0.1, 0.1], atol=0.01)
+
+    def test_link_with_eavesdropper(self):
+        network = local_backend.LocalNetwork(fidelity=1.0, seed=1)
+        link = network.link(("alice", 0), ("bob", 0))
+        link.eavesdrop = True
+
+        error_rates = self._measure_pairs(link, 20000)
+        np.testing.assert_allclose(error_rates, [0.0, 0.5], atol=0.02)
+
+    def test_run_local(self):
+        results = local_backend.run_local(fidelity=0.95, seed=1, key_length=64)
+        eavesdropped_results = local_backend.run_local(
+            eavesdropper=True,
+            seed=1,
+            key_length=256,
+        )
+
+        self.assertEqual(len(results["alice"]["secret_key"]), 64)
+        self.assertEqual(results["alice"]["secret_key"], results["bob"]["secret_key"])
+
+        self.assertIsNone(eavesdropped_results["alice"]["secret_key"])
+        self.assertIsNone(eavesdropped_results["bob"]["secret_key"])
+
+    def test_run_local_is_reproducible(self):
+        # The seed also seeds the randomness of the applications, so that
+        # runs with noise give the same keys every time.
+        results = [
+            local_backend.run_local(fidelity=0.9, seed=2, key_length=300, num_sessions=2)
+            for _ in range(2)
+        ]
+
+        self.assertEqual(results[0]["alice"]["secret_key"], results[1]["alice"]["secret_key"])
+        self.assertEqual(results[0]["bob"]["secret_key"], results[1]["bob"]["secret_key"])
+
+    def test_run_local_just_over_window_size(self):
+        # A key one bit longer than the window size is split into two
+        # windows of about half its length, rather than into a full window
+        # and a window of a single bit, whose QBER estimate would fail and
+        # discard the key.
+        for seed in range(10):
+            results = local_backend.run_local(
+                fidelity=0.9,
+                seed=seed,
+                key_length=1001,
+                window_size=1000,
+            )
+
+            self.assertEqual(len(results["alice"]["secret_key"]), 1001)
+            self.assertEqual(results["alice"]["secret_key"], results["bob"]["secret_key"])
+
+    def test_run_local_with_full_key_store(self):
+        # Keys which do not fit in the key store are skipped by both
+        # parties, while key generation goes on.
+        with patch.dict(os.environ, {
+            "QKD_KEY_STORE": self._log_directory.name,
+            "QKD_KEY_STORE_CAPACITY": "100",
+        }):
+            results = local_backend.run_local(seed=1, key_length=64, num_keys=3)
+
+        self.assertEqual(len(results["alice"]["secret_keys"]), 3)
+        self.assertEqual(results["alice"]["secret_keys"], results["bob"]["secret_keys"])
+
+        for role in ["alice", "bob"]:
+            with KeyStore(os.path.join(self._log_directory.name, f"{role}.keys")) as key_store:
+                self.assertEqual(key_store.capacity, 100)
+                self.assertEqual(key_store.next_key_id, 1)
+                self.assertEqual(key_store.take(64).tolist(), results["alice"]["secret_keys"][0])
+
+    def test_run_local_multi_party(self):
+        results = local_backend.run_local(seed=1, key_length=64, multi_party=1)
+
+        # Alice relays the key she shares with Bob to Charlie.
+        bob_key = results["bob"]["secret_key"]
+        self.assertEqual(len(bob_key), 64)
+        self.assertEqual(results["alice"]["peer_keys"]["bob"], bob_key)
+        self.assertEqual(results["charlie"]["relayed_key"], bob_key)
+
+        # The key Alice shares with Charlie was used up as a one-time pad,
+        # so neither of them reports it.
+        self.assertIsNone(results["alice"]["peer_keys"]["charlie"])
+        self.assertIsNone(results["charlie"]["secret_key"])
+
+    def test_run_local_with_biased_bases(self):
+        # An eavesdropper intercepting and resending in the Z basis only
+        # disturbs the rarely chosen X basis, which must still be sampled
+        # well enough to detect her.
+        results = local_backend.run_local(
+            fidelity=0.95,
+            seed=1,
+            key_length=16,
+            qber_mode=1,
+            z_basis_probability=0.9,
+        )
+        eavesdropped_results = [
+            local_backend.run_local(
+                eavesdropper=True,
+                seed=seed,
+                key_length=key_length,
+                qber_mode=qber_mode,
+                z_basis_probability=0.9,
+            )
+            for seed in range(3)
+            for key_length in [16, 256]
+            for qber_mode in [0, 1, 2]
+        ]
+
+        self.assertEqual(len(results["alice"]["secret_key"]), 16)
+        self.assertEqual(results["alice"]["secret_key"], results["bob"]["secret_key"])
+
+        for eavesdropped_result in eavesdropped_results:
+            self.assertIsNone(eavesdropped_result["alice"]["secret_key"])
+            self.assertIsNone(eavesdropped_result["bob"]["secret_key"])
+
+if __name__ == "__main__":
+    unittest.main()
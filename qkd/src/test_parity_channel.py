@@ -0,0 +1,94 @@
+import unittest
+
+from queue import Queue
+from threading import Thread
+from unittest.mock import MagicMock
+
+import parity_channel
+
+class TestParityChannel(unittest.TestCase):
+    def test_ask_parities_pipelines_questions(self):
+        socket = MagicMock()
+        socket.recv.side_effect = ["0#1", "1#0", "2#1"]
+
+        channel = parity_channel.ParityChannel(socket)
+        parities = channel.ask_parities([[0, 1], [2], [3, 4, 5]])
+
+        self.assertEqual(parities, [1, 0, 1])
+        self.assertEqual(
+            [c.args[0] for c in socket.send.call_args_list],
+            ["0#0,1", "1#2", "2#3,4,5"],
+        )
+
+    def test_responses_matched_out_of_order(self):
+        socket = MagicMock()
+        socket.recv.side_effect = ["2#0", "0#1", "1#1"]
+
+        channel = parity_channel.ParityChannel(socket)
+        tags = [channel.submit([i]) for i in range(3)]
+
+        self.assertEqual(channel.result(tags[1]), 1)
+        self.assertEqual(channel.result(tags[2]), 0)
+        self.assertEqual(channel.result(tags[0]), 1)
+
+    def test_segment_tagged_questions(self):
+        socket = MagicMock()
+        socket.recv.side_effect = ["0#1"]
+
+        channel = parity_channel.ParityChannel(socket)
+        channel.ask_parities([[4, 2]], segment_id=3)
+        socket.send.assert_called_with("3|0#4,2")
+
+    def test_shared_by_threads(self):
+        # A socket answering every question with the parity of its first
+        # index, in the order in which the questions arrive.
+        answers = Queue()
+
+        class AnsweringSocket:
+            def send(self, message):
+                tag, indices = message.split("|")[-1].split("#")
+                answers.put(f"{tag}#{int(indices.split(',')[0]) % 2}")
+
+            def recv(self):
+                return answers.get()
+
+        channel = parity_channel.ParityChannel(AnsweringSocket())
+        results = {}
+
+        def ask(segment_id):
+            blocks = [[segment_id * 100 + i] for i in range(50)]
+            results[segment_id] = channel.ask_parities(blocks, segment_id=segment_id)
+
+        threads = [Thread(target=ask, args=(segment_id,)) for segment_id in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for segment_id in range(4):
+            self.assertEqual(results[segment_id], [i % 2 for i in range(50)])
+        self.assertEqual(channel.leaked_bits, 200)
+
+    def test_parse_parity_question(self):
+        self.assertEqual(
+            parity_channel.parse_parity_question("3,1,5"),
+            (None, None, [3, 1, 5]),
+        )
+        self.assertEqual(
+            parity_channel.parse_parity_question("7#3,1"),
+            (None, 7, [3, 1]),
+        )
+        self.assertEqual(
+            parity_channel.parse_parity_question("2|7#3"),
+            (2, 7, [3]),
+        )
+
+    def test_as_parity_channel_wraps_functions(self):
+        def ask_parity_fn(block_indices):
+            return sum(block_indices) % 2
+
+        channel = parity_channel.as_parity_channel(ask_parity_fn)
+        self.assertEqual(channel.ask_parities([[0], [1], [1, 2]]), [0, 1, 1])
+
+if __name__ == "__main__":
+    unittest.main()
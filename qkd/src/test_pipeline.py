@@ -0,0 +1,81 @@
+import unittest
+
+from threading import Event
+
+import pipeline
+
+class TestPipeline(unittest.TestCase):
+    def test_stream_pipelined_preserves_order(self):
+        results = pipeline.stream_pipelined(
+            lambda item: item,
+            lambda item, m: m * 10,
+            list(range(5)),
+        )
+
+        self.assertEqual(list(results), [0, 10, 20, 30, 40])
+
+    def test_stream_pipelined_overlaps_stages(self):
+        # The classical stage of the first item only completes once the
+        # quantum stage of the second item has started.
+        second_item_started = Event()
+
+        def quantum_stage(item):
+            if item == 1:
+                second_item_started.set()
+            return item
+
+        def classical_stage(item, m):
+            self.assertTrue(second_item_started.wait(timeout=5))
+            return m
+
+        results = pipeline.stream_pipelined(quantum_stage, classical_stage, [0, 1])
+        self.assertEqual(list(results), [0, 1])
+
+    def test_stream_pipelined_raises_quantum_stage_errors(self):
+        def quantum_stage(item):
+            raise RuntimeError("EPR generation failed")
+
+        with self.assertRaises(RuntimeError):
+            list(pipeline.stream_pipelined(quantum_stage, lambda item, m: m, [0, 1, 2]))
+
+    def test_split_into_windows(self):
+        self.assertEqual(pipeline.split_into_windows(1000, 0), [1000])
+        self.assertEqual(pipeline.split_into_windows(1000, 400), [334, 333, 333])
+        self.assertEqual(pipeline.split_into_windows(800, 400), [400, 400])
+
+        # A key just over the window size is not left with a tiny window.
+        self.assertEqual(pipeline.split_into_windows(1001, 1000), [501, 500])
+
+        # Long keys are split into windows even when no window size is set.
+        max_window_size = pipeline.MAX_WINDOW_SIZE
+        self.assertEqual(
+            pipeline.split_into_windows(2 * max_window_size, 0),
+            [max_window_size, max_window_size],
+        )
+        self.assertEqual(
+            pipeline.split_into_windows(2 * max_window_size, 4 * max_window_size),
+            [max_window_size, max_window_size],
+        )
+
+    def test_stream_pipelined_is_bounded(self):
+        # The quantum stage runs at most two items ahead of the classical
+        # stage, however many items there are: one in the queue and one
+        # being measured.
+        num_measured = [0]
+
+        def quantum_stage(window_key_length):
+            num_measured[0] += 1
+            return [0] * window_key_length
+
+        results = pipeline.stream_pipelined(
+            quantum_stage,
+            lambda window_key_length, m: len(m),
+            [4] * 100,
+        )
+
+        self.assertEqual(next(results), 4)
+        self.assertLessEqual(num_measured[0], 3)
+        self.assertEqual(sum(results), 4 * 99)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import pstats
+import tempfile
+import unittest
+
+from threading import Event, Thread
+from unittest.mock import patch
+
+import profiling
+
+class TestProfiling(unittest.TestCase):
+    def test_phases_are_written(self):
+        with tempfile.TemporaryDirectory() as directory:
+            prefix = os.path.join(directory, "alice_profile")
+            profiler = profiling.PhaseProfiler(prefix)
+
+            for _ in range(2):
+                with profiling.phase(profiler, "sifting"):
+                    sum(range(1000))
+
+            with profiling.phase(profiler, "reconciliation"):
+                [0] * 1000
+
+            profiler.close()
+
+            for name in ["sifting", "reconciliation"]:
+                pstats.Stats(f"{prefix}_{name}.prof")
+
+            with open(f"{prefix}.txt", "r") as f:
+                report = f.read()
+
+            self.assertIn("sifting :: 2 runs", report)
+            self.assertIn("reconciliation :: 1 runs", report)
+            self.assertIn("peak", report)
+
+    def test_phase_peak(self):
+        with tempfile.TemporaryDirectory() as directory:
+            prefix = os.path.join(directory, "alice_profile")
+            profiler = profiling.PhaseProfiler(prefix)
+
+            # A phase which frees its temporaries still reports their peak.
+            with profiling.phase(profiler, "reconciliation"):
+                data = bytearray(2**23)
+                del data
+
+            with profiling.phase(profiler, "sifting"):
+                pass
+
+            profiler.close()
+
+            with open(f"{prefix}.txt", "r") as f:
+                lines = {line.split(" :: ")[0]: line for line in f}
+
+            self.assertGreaterEqual(float(lines["reconciliation"].split(" :: peak ")[1].split()[0]), 8.0)
+            self.assertLess(float(lines["sifting"].split(" :: peak ")[1].split()[0]), 1.0)
+            self.assertNotIn("approximate", lines["reconciliation"])
+
+    def test_concurrent_phases(self):
+        with tempfile.TemporaryDirectory() as directory:
+            prefix = os.path.join(directory, "alice_profile")
+            profiler = profiling.PhaseProfiler(prefix)
+            allocated = Event()
+            sifted = Event()
+
+            def reconcile():
+                with profiling.phase(profiler, "reconciliation"):
+                    data = bytearray(2**23)
+                    del data
+                    allocated.set()
+                    sifted.wait(timeout=5)
+
+            # A phase running while another one is in progress must not
+            # reset the peak memory traced during the other one.
+            thread = Thread(target=reconcile)
+            thread.start()
+            allocated.wait(timeout=5)
+            with profiling.phase(profiler, "sifting"):
+                pass
+            sifted.set()
+            thread.join()
+
+            profiler.close()
+
+            with open(f"{prefix}.txt", "r") as f:
+                lines = f.readlines()
+            peak_line = [line for line in lines if line.startswith("peak")][0]
+
+            self.assertGreaterEqual(float(peak_line.split()[1]), 8.0)
+
+            # Both runs overlapped, so their peaks are approximate.
+            for name in ["reconciliation", "sifting"]:
+                phase_line = [line for line in lines if line.startswith(name)][0]
+                self.assertIn("1 runs overlapped, approximate", phase_line)
+
+    def test_cpu_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            prefix = os.path.join(directory, "alice_profile")
+            profiler = profiling.PhaseProfiler(prefix, trace_memory=False)
+
+            with profiling.phase(profiler, "sifting"):
+                sum(range(1000))
+
+            profiler.close()
+
+            with open(f"{prefix}.txt", "r") as f:
+                self.assertEqual(f.read().count("MiB"), 0)
+
+    def test_profiling_enabled(self):
+        for value, enabled in [("", False), ("0", False), ("false", False), ("1", True), ("cpu", True)]:
+            with patch.dict(os.environ, {profiling.PROFILE_VARIABLE: value}):
+                self.assertEqual(profiling.profiling_enabled(0), enabled)
+                self.assertTrue(profiling.profiling_enabled(1))
+
+        with patch.dict(os.environ):
+            os.environ.pop(profiling.PROFILE_VARIABLE, None)
+            self.assertFalse(profiling.profiling_enabled(0))
+
+    def test_phase_without_profiler(self):
+        with profiling.phase(None, "sifting"):
+            pass
+
+if __name__ == '__main__':
+    unittest.main()
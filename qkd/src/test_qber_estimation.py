@@ -0,0 +1,107 @@
+import unittest
+
+import qber_estimation
+
+class TestQberEstimation(unittest.TestCase):
+    def test_sample_size(self):
+        self.assertEqual(qber_estimation.sample_size(), 106)
+
+        # A tighter tolerance requires a larger sample.
+        self.assertGreater(
+            qber_estimation.sample_size(tolerance=0.01),
+            qber_estimation.sample_size(),
+        )
+
+    def test_qber_upper_bound(self):
+        upper_bound = qber_estimation.qber_upper_bound(5, 100)
+        self.assertGreater(upper_bound, 0.05)
+        self.assertLess(upper_bound, 0.11)
+
+        # The bound tightens as more bits are observed.
+        self.assertLess(qber_estimation.qber_upper_bound(50, 1000), upper_bound)
+
+        self.assertGreater(qber_estimation.qber_upper_bound(0, 10), 0.0)
+        self.assertEqual(qber_estimation.qber_upper_bound(0, 0), 1.0)
+
+    def test_required_epr_pairs(self):
+        num_epr_pairs = qber_estimation.required_epr_pairs(1000)
+        self.assertGreater(num_epr_pairs, 2000)
+        self.assertLess(num_epr_pairs, 2300)
+
+        # A higher sifting probability requires fewer pairs.
+        self.assertLess(
+            qber_estimation.required_epr_pairs(1000, sifting_probability=0.8),
+            num_epr_pairs,
+        )
+
+    def test_num_epr_pairs(self):
+        self.assertEqual(
+            qber_estimation.num_epr_pairs(1024, qber_estimation.FULL_DISCLOSURE),
+            3072,
+        )
+        self.assertLess(
+            qber_estimation.num_epr_pairs(1024, qber_estimation.SAMPLED),
+            3072,
+        )
+        self.assertLess(
+            qber_estimation.num_epr_pairs(1024, qber_estimation.CASCADE),
+            qber_estimation.num_epr_pairs(1024, qber_estimation.SAMPLED),
+        )
+
+    def test_sifting_probability(self):
+        self.assertEqual(qber_estimation.sifting_probability(), 0.5)
+        self.assertAlmostEqual(qber_estimation.sifting_probability(0.9), 0.82)
+
+    def test_biased_num_epr_pairs(self):
+        # Cascade alone cannot check each basis, so a sample is disclosed.
+        self.assertEqual(
+            qber_estimation.effective_mode(qber_estimation.CASCADE, 0.9),
+            qber_estimation.SAMPLED,
+        )
+        self.assertEqual(
+            qber_estimation.effective_mode(qber_estimation.CASCADE),
+            qber_estimation.CASCADE,
+        )
+
+        # Enough pairs are generated to sample the rarely chosen basis, which
+        # dominates the cost for short keys.
+        min_sample_size = qber_estimation.MIN_BASIS_SAMPLE_SIZE
+        num_epr_pairs = qber_estimation.num_epr_pairs(16, qber_estimation.SAMPLED, 0.9)
+        self.assertGreater(num_epr_pairs * 0.01, min_sample_size)
+        self.assertEqual(
+            num_epr_pairs,
+            qber_estimation.required_epr_pairs(min_sample_size, 0.01),
+        )
+
+        # For long keys, the commonly chosen basis dominates and biased
+        # bases need fewer pairs than unbiased bases.
+        self.assertLess(
+            qber_estimation.num_epr_pairs(1 << 20, qber_estimation.SAMPLED, 0.9),
+            qber_estimation.num_epr_pairs(1 << 20, qber_estimation.SAMPLED),
+        )
+
+    def test_estimate_qber_per_basis(self):
+        local_bits = [0, 1, 1, 0, 1, 0]
+        remote_bits = [0, 1, 0, 0, 0, 1]
+        bases = [0, 0, 0, 0, 1, 1]
+
+        basis_errors = qber_estimation.estimate_qber_per_basis(
+            local_bits,
+            remote_bits,
+            bases,
+        )
+        self.assertEqual(basis_errors, [(1, 4), (2, 2)])
+
+        self.assertTrue(qber_estimation.exceeds_threshold(basis_errors))
+        # Too small a sample of either basis cannot rule out eavesdropping.
+        self.assertTrue(qber_estimation.exceeds_threshold([(1, 10), (0, 0)]))
+        self.assertTrue(qber_estimation.exceeds_threshold([(0, 1000), (0, 20)]))
+        self.assertFalse(qber_estimation.exceeds_threshold([(3, 200), (2, 150)]))
+
+        # The upper bound, rather than the estimate, is compared against the
+        # threshold.
+        self.assertLess(14 / 110, qber_estimation.QBER_THRESHOLD)
+        self.assertTrue(qber_estimation.exceeds_threshold([(0, 1000), (14, 110)]))
+
+if __name__ == "__main__":
+    unittest.main()
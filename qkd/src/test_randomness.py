@@ -0,0 +1,93 @@
+import os
+import threading
+import unittest
+
+import numpy as np
+
+import randomness
+
+class TestRandomness(unittest.TestCase):
+    def test_random_bits(self):
+        pool = randomness.RandomnessPool(buffer_size=64)
+        bits = np.concatenate([pool.random_bits(13) for _ in range(100)])
+
+        self.assertEqual(len(bits), 1300)
+        self.assertTrue(set(bits.tolist()) <= {0, 1})
+        self.assertAlmostEqual(bits.mean(), 0.5, delta=0.1)
+
+    def test_random_bases(self):
+        bases = randomness.random_bases(10000, z_basis_probability=0.9)
+
+        self.assertTrue(set(bases.tolist()) <= {0, 1})
+        self.assertAlmostEqual(bases.mean(), 0.1, delta=0.02)
+
+    def test_random_integers(self):
+        integers = randomness.random_integers(1000, 7)
+
+        self.assertEqual(len(integers), 1000)
+        self.assertEqual(set(integers.tolist()), set(range(7)))
+
+    def test_permutation(self):
+        permutation = randomness.permutation(1000)
+
+        self.assertEqual(sorted(permutation.tolist()), list(range(1000)))
+        self.assertNotEqual(permutation.tolist(), list(range(1000)))
+
+    def test_sample(self):
+        indices = randomness.sample(100, 30).tolist()
+
+        self.assertEqual(len(set(indices)), 30)
+        self.assertTrue(all(0 <= i < 100 for i in indices))
+
+        # Samples of more than half the population come from a permutation.
+        self.assertEqual(sorted(randomness.sample(10, 10).tolist()), list(range(10)))
+        self.assertEqual(len(randomness.sample(10, 0)), 0)
+
+        with self.assertRaises(ValueError):
+            randomness.sample(10, 11)
+
+    def test_sample_is_uniform(self):
+        samples = np.array([randomness.sample(10, 4) for _ in range(5000)])
+
+        # Every index is equally likely, in every position of the sample.
+        for position in range(4):
+            counts = np.bincount(samples[:, position], minlength=10)
+            np.testing.assert_allclose(counts / 5000, 0.1, atol=0.02)
+
+    def test_seeded_pool(self):
+        def draw(pool, name):
+            bits = []
+            thread = threading.Thread(target=lambda: bits.append(pool.random_bits(64)), name=name)
+            thread.start()
+            thread.join()
+            return bits[0].tolist()
+
+        pool = randomness.RandomnessPool(seed=1)
+        other_pool = randomness.RandomnessPool(seed=1)
+
+        # Threads get the same bytes from pools with the same seed, however
+        # they are scheduled, and other bytes than threads of another name.
+        alice_bits = draw(pool, "alice")
+        self.assertEqual(draw(other_pool, "bob"), draw(pool, "bob"))
+        self.assertEqual(draw(other_pool, "alice"), alice_bits)
+        self.assertNotEqual(draw(pool, "bob"), alice_bits)
+
+        # A later thread of the same name gets a stream of its own.
+        self.assertNotEqual(draw(pool, "alice"), alice_bits)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_fork_while_locked(self):
+        pool = randomness.RandomnessPool(buffer_size=64)
+
+        # A child forked while another thread holds the lock of the pool
+        # must still be able to draw from it.
+        with pool._lock:
+            pid = os.fork()
+            if pid == 0:
+                os._exit(0 if len(pool.random_bits(8)) == 8 else 1)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+if __name__ == '__main__':
+    unittest.main()
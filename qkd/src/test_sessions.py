@@ -0,0 +1,95 @@
+import unittest
+
+from threading import Barrier
+from unittest.mock import MagicMock
+
+import sessions
+
+class TestSessions(unittest.TestCase):
+    def test_run_concurrently(self):
+        # Each function only completes once all of them are running.
+        barrier = Barrier(3, timeout=5)
+
+        def session(i):
+            barrier.wait()
+            return i
+
+        results = sessions.run_concurrently([
+            lambda: session(0),
+            lambda: session(1),
+            lambda: session(2),
+        ])
+        self.assertEqual(results, [0, 1, 2])
+
+    def test_split_key_length(self):
+        self.assertEqual(sessions.split_key_length(16, 1), [16])
+        self.assertEqual(sessions.split_key_length(16, 3), [6, 5, 5])
+
+    def test_combine_key_results(self):
+        key_results = [
+            {"secret_key": [0, 1], "leaked_bits": 4, "qber": 0.1, "qber_upper_bound": 0.2},
+            {"secret_key": [1], "leaked_bits": 3, "qber": 0.0, "qber_upper_bound": 0.3},
+        ]
+
+        combined = sessions.combine_key_results(key_results)
+        self.assertEqual(combined["secret_key"], [0, 1, 1])
+        self.assertEqual(combined["leaked_bits"], 7)
+        self.assertAlmostEqual(combined["qber"], 0.05)
+        self.assertEqual(combined["qber_upper_bound"], 0.3)
+
+        # The combined key is discarded if any session failed.
+        key_results[1]["secret_key"] = None
+        self.assertIsNone(sessions.combine_key_results(key_results)["secret_key"])
+
+    def test_combine_windows(self):
+        window_results = [
+            {"secret_key": [0], "leaked_bits": 1, "qber": 0.1, "qber_upper_bound": 0.2,
+             "peer_keys": {"bob": [0], "charlie": [1]}},
+            {"secret_key": [1], "leaked_bits": 1, "qber": None, "qber_upper_bound": None,
+             "peer_keys": {"bob": [1], "charlie": None}},
+        ]
+
+        # Two keys, each of two windows.
+        combined = list(sessions.combine_windows(window_results * 2, [1, 1]))
+        self.assertEqual(len(combined), 2)
+
+        self.assertEqual(combined[0]["secret_key"].tolist(), [0, 1])
+        self.assertEqual(combined[0]["peer_keys"]["bob"].tolist(), [0, 1])
+        self.assertIsNone(combined[0]["peer_keys"]["charlie"])
+        self.assertEqual(combined[0]["leaked_bits"], 2)
+        self.assertAlmostEqual(combined[0]["qber"], 0.1)
+        self.assertEqual(combined[0]["qber_upper_bound"], 0.2)
+
+        # Keys of a single window are passed through.
+        self.assertEqual(
+            list(sessions.combine_windows(window_results, [1])),
+            window_results,
+        )
+
+    def test_relay_key(self):
+        bob_key = [0, 1, 1, 0]
+        charlie_key = [1, 1, 0, 0]
+
+        alice_socket = MagicMock()
+        self.assertTrue(sessions.relay_key(bob_key, charlie_key, alice_socket))
+        message = alice_socket.send.call_args.args[0]
+        self.assertEqual(message, "1010")
+
+        charlie_socket = MagicMock()
+        charlie_socket.recv.return_value = message
+        self.assertEqual(
+            sessions.receive_relayed_key(charlie_key, charlie_socket),
+            bob_key,
+        )
+
+    def test_relay_missing_key(self):
+        alice_socket = MagicMock()
+        self.assertFalse(sessions.relay_key(None, [1, 0], alice_socket))
+        alice_socket.send.assert_called_with("NONE")
+
+        charlie_socket = MagicMock()
+        charlie_socket.recv.return_value = "NONE"
+        self.assertIsNone(sessions.receive_relayed_key([1, 0], charlie_socket))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+import unittest
+
+import topology
+
+class TestTopology(unittest.TestCase):
+    def test_load_topology(self):
+        two_party = topology.load_topology()
+        self.assertEqual(two_party.roles(), ["alice", "bob"])
+        self.assertEqual(two_party.relay_routes, [])
+        self.assertEqual(two_party.neighbours("charlie"), [])
+
+        multi_party = topology.load_topology(multi_party=True)
+        self.assertEqual(multi_party.roles(), ["alice", "bob", "charlie"])
+        self.assertEqual(multi_party.relay_routes, [("bob", "charlie")])
+        self.assertEqual(multi_party.neighbours("alice"), ["bob", "charlie"])
+        self.assertEqual(multi_party.neighbours("charlie"), ["alice"])
+        self.assertEqual(multi_party.relay_source("charlie"), "bob")
+        self.assertIsNone(multi_party.relay_source("bob"))
+
+    def test_load_topology_from_config(self):
+        with tempfile.TemporaryDirectory() as directory:
+            network_config_path = os.path.join(directory, "network.json")
+            application_config_path = os.path.join(directory, "application.json")
+
+            with open(network_config_path, "w") as f:
+                json.dump({"roles": ["hub", "a", "b", "c"]}, f)
+            with open(application_config_path, "w") as f:
+                json.dump([
+                    {"values": [{"name": "multi_party"}], "roles": ["hub", "c"]},
+                    {"values": [{"name": "key_length"}], "roles": ["hub", "a", "b", "c"]},
+                ], f)
+
+            two_party = topology.load_topology(
+                False,
+                network_config_path,
+                application_config_path,
+            )
+            self.assertEqual(two_party.peers, ["a", "b"])
+            self.assertEqual(two_party.relay_routes, [("a", "b")])
+
+            multi_party = topology.load_topology(
+                True,
+                network_config_path,
+                application_config_path,
+            )
+            self.assertEqual(multi_party.relay_routes, [("a", "b"), ("a", "c")])
+
+if __name__ == "__main__":
+    unittest.main()
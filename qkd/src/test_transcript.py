@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+from unittest.mock import patch
+
+import local_backend
+import replay
+import transcript
+
+class TestTranscript(unittest.TestCase):
+    def test_read_transcript(self):
+        with tempfile.TemporaryDirectory() as transcript_dir:
+            path = transcript.transcript_path(transcript_dir, "alice")
+
+            with transcript.TranscriptWriter(path) as writer:
+                writer.write([1, 0, 1, 1, 0, 0, 1, 0, 1], [0, 0, 1, 1, 1, 0, 0, 0, 1])
+                writer.write([1], [0])
+
+            # Each EPR pair takes two bits, along with a header per record.
+            self.assertEqual(os.path.getsize(path), 5 + (8 + 2 + 2) + (8 + 1 + 1))
+
+            self.assertEqual(list(transcript.read_transcript(path)), [
+                ([1, 0, 1, 1, 0, 0, 1, 0, 1], [0, 0, 1, 1, 1, 0, 0, 0, 1]),
+                ([1], [0]),
+            ])
+
+    def test_replay(self):
+        working_directory = os.getcwd()
+
+        with tempfile.TemporaryDirectory() as transcript_dir:
+            # The applications write their log files to the working directory.
+            os.chdir(transcript_dir)
+            try:
+                with patch.dict(os.environ, {transcript.TRANSCRIPT_DIR_VARIABLE: transcript_dir}):
+                    local_backend.run_local(fidelity=0.95, seed=1, key_length=64, num_keys=2)
+
+                results = replay.replay(transcript_dir, seed=1, key_length=64, num_keys=2)
+
+                # Replaying with other parameters asks for a different number
+                # of EPR pairs than was recorded.
+                with self.assertRaises(ValueError):
+                    replay.replay(transcript_dir, key_length=128)
+            finally:
+                os.chdir(working_directory)
+
+        self.assertEqual(len(results["alice"]["secret_key"]), 64)
+        self.assertEqual(results["alice"]["secret_keys"], results["bob"]["secret_keys"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from unittest.mock import MagicMock
+
+import util
+
+class TestUtil(unittest.TestCase):
+    def test_measure_epr_in_random_bases_on_sockets(self):
+        conn = MagicMock()
+        epr_sockets = [MagicMock(), MagicMock()]
+
+        results = util.measure_epr_in_random_bases_on_sockets(
+            conn,
+            epr_sockets,
+            5,
+            z_basis_probability=1.0,
+        )
+
+        self.assertEqual(len(results), 2)
+        for epr_socket, (measurements, measurement_bases) in zip(epr_sockets, results):
+            self.assertEqual(epr_socket.create_keep.call_count, 5)
+            self.assertEqual(len(measurements), 5)
+            self.assertEqual(measurement_bases, [0] * 5)
+
+        # The pairs of all sockets are measured before each flush.
+        self.assertEqual(conn.flush.call_count, 5)
+
+    def test_derive_raw_key(self):
+        local_bases = [0, 1, 1, 0, 1]
+        remote_bases = [0, 0, 1, 1, 1]
+        measurements = [1, 0, 0, 1, 1]
+
+        self.assertEqual(
+            util.derive_raw_key(local_bases, remote_bases, measurements),
+            [1, 0, 1],
+        )
+        self.assertEqual(
+            util.derive_raw_key_bases(local_bases, remote_bases),
+            [0, 1, 1],
+        )
+
+    def test_get_random_raw_key_subset(self):
+        raw_key = [0, 1, 1, 0, 1, 0, 0, 1]
+
+        indices, values = util.get_random_raw_key_subset(raw_key, 5)
+        self.assertEqual(len(indices), 3)
+        self.assertEqual(values, [raw_key[i] for i in indices])
+
+        indices, _ = util.get_random_raw_key_subset(raw_key, 5, subset_size=2)
+        self.assertEqual(len(indices), 2)
+
+    def test_get_stratified_raw_key_subset(self):
+        raw_key = [0, 1, 1, 0, 1, 0, 0, 1]
+        raw_key_bases = [0, 0, 0, 0, 0, 0, 1, 1]
+
+        indices, values = util.get_stratified_raw_key_subset(
+            raw_key,
+            raw_key_bases,
+            [1, 2],
+        )
+        self.assertEqual([raw_key_bases[i] for i in indices], [0, 1, 1])
+        self.assertEqual(values, [raw_key[i] for i in indices])
+
+    def test_filter_comparison_bits(self):
+        raw_key = [0, 1, 1, 0, 1]
+        self.assertEqual(util.filter_comparison_bits(raw_key, [1, 4]), [0, 1, 0])
+        self.assertEqual(util.filter_comparison_bits(raw_key, []), raw_key)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from queue import Queue
+from threading import Thread
+from unittest.mock import MagicMock
+
+import numpy as np
+
+import winnow
+
+class TestWinnow(unittest.TestCase):
+    def test_hamming_syndromes(self):
+        blocks = np.zeros((2, 8), dtype=np.int64)
+        blocks[0, [2, 4]] = 1
+
+        # The syndrome is the XOR of the one-based positions 3 and 5, and
+        # the last bit of a block is not covered.
+        blocks[1, 7] = 1
+
+        self.assertEqual(winnow.hamming_syndromes(blocks).tolist(), [6, 0])
+
+    def test_client_winnow(self):
+        rng = np.random.default_rng(7)
+        correct_key = rng.integers(2, size=4000)
+        noisy_key = correct_key.copy()
+
+        error_indices = rng.choice(len(correct_key), size=80, replace=False)
+        noisy_key[error_indices] ^= 1
+
+        responder = winnow.WinnowResponder(correct_key)
+        corrected_key = winnow.client_winnow(
+            noisy_key,
+            0.02,
+            responder.block_parities,
+            responder.syndromes,
+        )
+
+        self.assertEqual(corrected_key.tolist(), correct_key.tolist())
+
+    def test_client_winnow_over_socket(self):
+        correct_key = [0, 1] * 50
+        noisy_key = list(correct_key)
+        noisy_key[17] ^= 1
+
+        # A pair of sockets connected through queues.
+        questions, answers = Queue(), Queue()
+        alice_socket = MagicMock(send=answers.put, recv=questions.get)
+        bob_socket = MagicMock(send=questions.put, recv=lambda: answers.get(timeout=5))
+
+        alice_leaked_bits = []
+        alice = Thread(target=lambda: alice_leaked_bits.append(
+            winnow.listen_and_respond_winnow(correct_key, alice_socket)
+        ))
+        alice.start()
+
+        channel = winnow.WinnowChannel(bob_socket)
+        corrected_key = winnow.client_winnow(noisy_key, 0.01, channel.block_parities, channel.syndromes)
+        bob_socket.send("STOP")
+        alice.join(timeout=5)
+
+        self.assertEqual(corrected_key.tolist(), correct_key)
+        self.assertFalse(alice.is_alive())
+
+        # Both sides agree on the number of disclosed parity bits.
+        self.assertEqual(alice_leaked_bits, [channel.leaked_bits])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+
+# The configuration of the application, which lists the roles of the
+# network and the parameters passed to each role.
+CONFIG_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "config",
+)
+NETWORK_CONFIG_PATH = os.path.join(CONFIG_DIR, "network.json")
+APPLICATION_CONFIG_PATH = os.path.join(CONFIG_DIR, "application.json")
+
+# The parameter which lets the roles it is passed to, other than the hub,
+# take part in the run.
+MULTI_PARTY_PARAMETER = "multi_party"
+
+class Topology:
+    """
+    The roles taking part in a run and how keys flow between them.
+
+    The hub generates EPR pairs with each of its peers and negotiates a key
+    with each of them. Acting as a trusted node, it relays the key it shares
+    with the source of each relay route to the destination of the route,
+    encrypted with the key it shares with the destination.
+    """
+
+    def __init__(self, hub, peers, relay_routes):
+        self.hub = hub
+        self.peers = peers
+        self.relay_routes = relay_routes
+
+    def roles(self):
+        """
+        Returns the roles taking part in the run, starting with the hub.
+        """
+        return [self.hub] + self.peers
+
+    def neighbours(self, role):
+        """
+        Returns the roles the given role negotiates keys with, which is
+        every peer for the hub, the hub for a peer and none for a role
+        which does not take part in the run.
+        """
+        if role == self.hub:
+            return self.peers
+        if role in self.peers:
+            return [self.hub]
+        return []
+
+    def relay_source(self, role):
+        """
+        Returns the role whose key with the hub is relayed to the given
+        role, or None if no key is relayed to it.
+        """
+        for source, destination in self.relay_routes:
+            if destination == role:
+                return source
+        return None
+
+def _load_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def load_topology(
+        multi_party=False,
+        network_config_path=NETWORK_CONFIG_PATH,
+        application_config_path=APPLICATION_CONFIG_PATH,
+):
+    """
+    Builds the topology of a run from the network and application
+    configuration.
+
+    The first role of the network is the hub, and every other role is one
+    of its peers. Roles to which the multi-party parameter is passed only
+    take part in multi-party mode. The hub relays the key it shares with
+    its first peer to every other peer, whether or not they are adjacent
+    in the network.
+
+    Arguments:
+
+    multi_party - Determines whether the multi-party roles take part.
+    network_config_path - The path of network.json.
+    application_config_path - The path of application.json.
+
+    Returns:
+
+    topology - The topology of the run.
+    """
+    roles = _load_json(network_config_path)["roles"]
+
+    multi_party_roles = {
+        role
+        for param in _load_json(application_config_path)
+        if any(value["name"] == MULTI_PARTY_PARAMETER for value in param["values"])
+        for role in param["roles"]
+    }
+
+    hub = roles[0]
+    peers = [role for role in roles[1:] if multi_party or role not in multi_party_roles]
+    relay_routes = [(peers[0], peer) for peer in peers[1:]]
+
+    return Topology(hub, peers, relay_routes)
@@ -0,0 +1,87 @@
+import os
+import struct
+
+import numpy as np
+
+# The environment variable pointing to the directory in which the
+# applications record their transcripts.
+TRANSCRIPT_DIR_VARIABLE = "QKD_TRANSCRIPT_DIR"
+
+_MAGIC = b"QKDT"
+_VERSION = 1
+
+# Each record starts with the number of EPR pairs it contains.
+_RECORD_HEADER = struct.Struct(">Q")
+
+class TranscriptWriter:
+    """
+    Writes the measurements and measurement bases of a party to a binary
+    transcript file, so that post-processing can be replayed without the
+    quantum simulation.
+
+    The file starts with a magic number and a version, followed by one
+    record per batch of measurements on an EPR socket. A record holds the
+    number of EPR pairs, followed by the packed measurements and the packed
+    measurement bases, so that each EPR pair takes two bits.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "wb")
+        self._file.write(_MAGIC + bytes([_VERSION]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, measurements, measurement_bases):
+        """
+        Appends a record with the measurements and measurement bases of a
+        batch of EPR pairs.
+        """
+        self._file.write(_RECORD_HEADER.pack(len(measurements)))
+        self._file.write(np.packbits(np.asarray(measurements, dtype=np.uint8)).tobytes())
+        self._file.write(np.packbits(np.asarray(measurement_bases, dtype=np.uint8)).tobytes())
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def read_transcript(path):
+    """
+    Reads the records of a transcript file one at a time.
+
+    Yields:
+
+    measurements - A list containing an integer measurement for each pair.
+    measurement_bases - A list containing the measurement basis used for each pair.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC) + 1) != _MAGIC + bytes([_VERSION]):
+            raise ValueError(f"{path} is not a version {_VERSION} transcript")
+
+        record_header = f.read(_RECORD_HEADER.size)
+
+        while record_header:
+            (num_pairs,) = _RECORD_HEADER.unpack(record_header)
+            num_bytes = -(-num_pairs // 8)
+
+            measurements = np.unpackbits(
+                np.frombuffer(f.read(num_bytes), dtype=np.uint8),
+                count=num_pairs,
+            )
+            measurement_bases = np.unpackbits(
+                np.frombuffer(f.read(num_bytes), dtype=np.uint8),
+                count=num_pairs,
+            )
+
+            yield measurements.tolist(), measurement_bases.tolist()
+
+            record_header = f.read(_RECORD_HEADER.size)
+
+def transcript_path(transcript_dir, role):
+    """
+    Returns the path of the transcript of a role in a transcript directory.
+    """
+    return os.path.join(transcript_dir, f"{role}.transcript")
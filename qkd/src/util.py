@@ -1,6 +1,14 @@
-from random import randint, sample
+import numpy as np
 
-def measure_epr_in_random_bases(conn, epr_socket, num_epr_pairs, create_epr=True):
+import randomness
+
+def measure_epr_in_random_bases(
+        conn,
+        epr_socket,
+        num_epr_pairs,
+        create_epr=True,
+        z_basis_probability=0.5,
+):
     """
     Measures EPR pairs in random measurement bases.
 
@@ -10,42 +18,72 @@ def measure_epr_in_random_bases(conn, epr_socket, num_epr_pairs, create_epr=True
     epr_socket - An EPR socket.
     num_epr_pairs - The number of EPR pairs to create or receive.
     create_epr - Determines whether or not to create or receive EPR pairs.
+    z_basis_probability - The probability of measuring in the Z basis (0)
+        instead of the X basis (1).
 
     Returns:
 
     measurements - A list containing a measurement for each pair.
     measurement_bases - A list containing the measurement basis used for each pair.
     """
+    return measure_epr_in_random_bases_on_sockets(
+        conn,
+        [epr_socket],
+        num_epr_pairs,
+        create_epr=create_epr,
+        z_basis_probability=z_basis_probability,
+    )[0]
+
+def measure_epr_in_random_bases_on_sockets(
+        conn,
+        epr_sockets,
+        num_epr_pairs,
+        create_epr=True,
+        z_basis_probability=0.5,
+):
+    """
+    Measures EPR pairs on several EPR sockets at the same time, in random
+    measurement bases. The pairs of all sockets are created or received in
+    the same subroutine before the commands are flushed.
+
+    Returns a list containing the measurements and measurement bases for
+    each EPR socket.
+    """
 
-    measurements = []
-    measurement_bases = []
+    results = [([], []) for _ in epr_sockets]
 
-    for i in range(num_epr_pairs):
-        q = None
+    # Selecting random bases for all pairs up front.
+    bases = randomness.random_bases(
+        num_epr_pairs * len(epr_sockets),
+        z_basis_probability,
+    ).reshape(num_epr_pairs, len(epr_sockets)).tolist()
 
-        if create_epr:
-            # Creating entangled pairs.
-            q = epr_socket.create_keep(1)[0]
-        else:
-            # Receiving entangled pairs.
-            q = epr_socket.recv_keep(1)[0]
+    for pair_bases in bases:
+        for epr_socket, basis, (measurements, measurement_bases) in zip(epr_sockets, pair_bases, results):
+            q = None
 
-        # Selecting a random basis and measuring.
-        basis = randint(0, 1)
-        if basis == 1:
-            q.H()
-        m = q.measure()
+            if create_epr:
+                # Creating entangled pairs.
+                q = epr_socket.create_keep(1)[0]
+            else:
+                # Receiving entangled pairs.
+                q = epr_socket.recv_keep(1)[0]
 
-        # Recording measurement.
-        measurements.append(m)
+            # Measuring in the selected basis.
+            if basis == 1:
+                q.H()
+            m = q.measure()
 
-        # Recording measurement basis.
-        measurement_bases.append(basis)
+            # Recording measurement.
+            measurements.append(m)
+
+            # Recording measurement basis.
+            measurement_bases.append(basis)
 
         # Flushing commands.
         conn.flush()
 
-    return measurements, measurement_bases
+    return results
 
 def publish_measurement_bases(measurement_bases, socket): 
     """
@@ -103,29 +141,47 @@ def derive_raw_key(local_bases, remote_bases, measurements):
     Derives a raw key from the bits where the chosen measurement bases
     were the same for both parties.
     """
-    raw_key = []
 
     # Filtering out bits where measurement bases differed.
-    for i in range(len(measurements)):
-        local_basis = local_bases[i]
-        remote_basis = remote_bases[i]
-
-        if local_basis == remote_basis:
-            raw_key.append(measurements[i])
+    same_bases = np.asarray(local_bases) == np.asarray(remote_bases)
+    return np.asarray(measurements)[same_bases].tolist()
 
-    return raw_key
+def derive_raw_key_bases(local_bases, remote_bases):
+    """
+    Derives the measurement basis of each bit of the raw key.
+    """
+    return derive_raw_key(local_bases, remote_bases, local_bases)
 
-def get_random_raw_key_subset(raw_key, target_key_length):
+def get_random_raw_key_subset(raw_key, target_key_length, subset_size=None):
     """
     Returns the indices and values for a random subset of the raw key.
+
+    Unless a subset size is given, the subset contains all bits beyond
+    the target key length.
     """
     raw_key_size = len(raw_key)
-    subset_size = raw_key_size - target_key_length
 
-    subset_indices = sample(
-        [*range(raw_key_size)],
-        k=subset_size,
-    ) 
+    if subset_size is None:
+        subset_size = raw_key_size - target_key_length
+
+    subset_indices = randomness.sample(raw_key_size, subset_size).tolist()
+    subset_values = [raw_key[i] for i in subset_indices]
+
+    return subset_indices, subset_values
+
+def get_stratified_raw_key_subset(raw_key, raw_key_bases, subset_sizes):
+    """
+    Returns the indices and values for a random subset of the raw key
+    containing the given number of bits from each measurement basis.
+    """
+    subset_indices = []
+
+    for basis, subset_size in enumerate(subset_sizes):
+        basis_indices = [i for i, b in enumerate(raw_key_bases) if b == basis]
+        subset_indices += [
+            basis_indices[i] for i in randomness.sample(len(basis_indices), subset_size)
+        ]
+
     subset_values = [raw_key[i] for i in subset_indices]
 
     return subset_indices, subset_values
@@ -134,10 +190,10 @@ def filter_comparison_bits(raw_key, comparison_subset_indices):
     """
     Filters comparison bits from raw key to produce a final secret key.
     """
-    secret_key_bits = []
 
-    for i in range(len(raw_key)):
-        if not i in comparison_subset_indices:
-            secret_key_bits.append(raw_key[i])
+    # Masking out the compared bits, which takes linear time in the length
+    # of the raw key regardless of the number of compared bits.
+    keep = np.ones(len(raw_key), dtype=bool)
+    keep[np.asarray(comparison_subset_indices, dtype=int)] = False
 
-    return secret_key_bits
+    return np.asarray(raw_key)[keep].tolist()
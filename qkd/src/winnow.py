@@ -0,0 +1,205 @@
+import numpy as np
+
+import randomness
+
+# Blocks are never smaller than 2^MIN_SYNDROME_BITS bits.
+MIN_SYNDROME_BITS = 3
+
+def _shuffled_blocks(key, seed, block_size):
+    """
+    Shuffles a key with the permutation derived from the given seed and
+    splits it into the rows of a matrix of blocks. The key is padded with
+    zeros to a multiple of the block size.
+
+    Returns the matrix of blocks along with the permutation.
+    """
+    key = np.asarray(key, dtype=np.int64)
+    permutation = np.random.default_rng(seed).permutation(len(key))
+
+    padded_key = np.zeros(-(-len(key) // block_size) * block_size, dtype=np.int64)
+    padded_key[:len(key)] = key[permutation]
+
+    return padded_key.reshape(-1, block_size), permutation
+
+def hamming_syndromes(blocks):
+    """
+    Computes the Hamming syndrome of the first 2^m - 1 bits of each block of
+    2^m bits, as an integer per block. The syndrome is the XOR of the
+    (one-based) positions of all bits which are set.
+    """
+    num_syndrome_bits = int(np.log2(blocks.shape[1]))
+
+    # Column j of the parity check matrix is the binary representation of j + 1.
+    positions = np.arange(1, blocks.shape[1])
+    parity_check_matrix = (positions[None, :] >> np.arange(num_syndrome_bits)[:, None]) & 1
+
+    syndrome_bits = (blocks[:, :-1] @ parity_check_matrix.T) % 2
+    return syndrome_bits @ (1 << np.arange(num_syndrome_bits))
+
+class WinnowResponder:
+    """
+    Answers the questions of client_winnow using the correct key.
+
+    The number of parity bits disclosed is counted in leaked_bits.
+    """
+
+    def __init__(self, correct_key):
+        self._correct_key = correct_key
+        self._blocks = None
+        self.leaked_bits = 0
+
+    def block_parities(self, seed, block_size):
+        """
+        Starts a new pass and returns the parities of all of its blocks.
+        """
+        self._blocks, _ = _shuffled_blocks(self._correct_key, seed, block_size)
+        self.leaked_bits += len(self._blocks)
+
+        return self._blocks.sum(axis=1) % 2
+
+    def syndromes(self, block_ids):
+        """
+        Returns the Hamming syndromes of the given blocks of the current pass.
+        """
+        num_syndrome_bits = int(np.log2(self._blocks.shape[1]))
+        self.leaked_bits += num_syndrome_bits * len(block_ids)
+
+        return hamming_syndromes(self._blocks[block_ids])
+
+def client_winnow(noisy_key, qber, ask_block_parities_fn, ask_syndromes_fn):
+    """
+    An implementation of the Winnow information reconciliation algorithm.
+
+    In every pass, the key is shuffled and split into blocks of 2^m bits.
+    The block parities of the whole pass are exchanged at once, followed by
+    the Hamming syndromes of all blocks with odd error parity, which locate
+    a single error per block. Each pass therefore takes two round trips,
+    independently of the number of blocks and of their size.
+
+    Arguments:
+
+    noisy_key - The key to correct.
+    qber - The estimated quantum bit error rate.
+    ask_block_parities_fn - A function taking a permutation seed and a block
+        size, and returning the correct parities of all blocks of the pass.
+    ask_syndromes_fn - A function taking a list of block ids of the current
+        pass, and returning the correct Hamming syndromes of those blocks.
+
+    Returns:
+
+    noisy_key - The corrected key.
+    """
+
+    # Representing the noisy key as a NumPy array, if it isn't already.
+    noisy_key = np.array(noisy_key)
+
+    key_length = len(noisy_key)
+
+    # If the estimated quantum bit error rate is 0%, assume that a reasonable
+    # amount of errors were present outside of the sampling set.
+    if qber == 0.0:
+        qber = 0.1
+
+    # The initial block size is chosen to hold at most about two thirds of
+    # an error on average, as blocks with three errors are miscorrected.
+    num_syndrome_bits = max(MIN_SYNDROME_BITS, int(np.floor(np.log2(1 / (1.5 * qber)))))
+
+    iteration = 0
+
+    while True:
+        block_size = 2**num_syndrome_bits
+        seed = int(randomness.random_integers(1, 2**63)[0])
+
+        blocks, permutation = _shuffled_blocks(noisy_key, seed, block_size)
+
+        # Exchanging the parities of all blocks of the pass.
+        correct_block_parities = np.asarray(ask_block_parities_fn(seed, block_size))
+        error_parities = (blocks.sum(axis=1) % 2) ^ correct_block_parities
+
+        odd_block_ids = np.flatnonzero(error_parities)
+
+        if len(odd_block_ids) > 0:
+            # Exchanging the syndromes of all blocks with odd error parity.
+            correct_syndromes = np.asarray(ask_syndromes_fn(odd_block_ids.tolist()))
+            error_syndromes = hamming_syndromes(blocks[odd_block_ids]) ^ correct_syndromes
+
+            # A zero syndrome means that the error is in the last bit of the
+            # block, which isn't covered by the Hamming code.
+            error_positions = np.where(error_syndromes == 0, block_size, error_syndromes) - 1
+            shuffled_indices = odd_block_ids * block_size + error_positions
+
+            # Errors located in the padding are the result of blocks with
+            # three or more errors, and are left to later passes.
+            shuffled_indices = shuffled_indices[shuffled_indices < key_length]
+            noisy_key[permutation[shuffled_indices]] ^= 1
+
+        # The first block size is used for two passes, after which the
+        # block size is doubled until a single block covers the key.
+        if iteration > 0:
+            if block_size >= key_length:
+                break
+            num_syndrome_bits += 1
+
+        iteration += 1
+
+    return noisy_key
+
+class WinnowChannel:
+    """
+    Asks Winnow's questions over a NetQASM socket, providing the functions
+    expected by client_winnow.
+
+    Block parities are asked as "PARITIES:<seed>:<block size>" and answered
+    with a string of parities, while syndromes are asked as
+    "SYNDROMES:<block ids>" and answered with comma separated integers.
+
+    The number of parity bits received is counted in leaked_bits.
+    """
+
+    def __init__(self, socket):
+        self._socket = socket
+        self._num_syndrome_bits = 0
+        self.leaked_bits = 0
+
+    def block_parities(self, seed, block_size):
+        self._socket.send(f"PARITIES:{seed}:{block_size}")
+        parities = [int(p) for p in self._socket.recv()]
+
+        self._num_syndrome_bits = int(np.log2(block_size))
+        self.leaked_bits += len(parities)
+
+        return parities
+
+    def syndromes(self, block_ids):
+        self._socket.send("SYNDROMES:" + ",".join([str(b) for b in block_ids]))
+        syndromes = [int(s) for s in self._socket.recv().split(",")]
+
+        self.leaked_bits += self._num_syndrome_bits * len(syndromes)
+
+        return syndromes
+
+def listen_and_respond_winnow(correct_key, socket):
+    """
+    Listens for Winnow questions and responds.
+
+    Returns the number of parity bits disclosed.
+    """
+    responder = WinnowResponder(correct_key)
+
+    question = socket.recv()
+
+    while question != "STOP":
+        question_type, arguments = question.split(":", 1)
+
+        if question_type == "PARITIES":
+            seed, block_size = [int(a) for a in arguments.split(":")]
+            parities = responder.block_parities(seed, block_size)
+            socket.send("".join([str(p) for p in parities]))
+        else:
+            block_ids = [int(b) for b in arguments.split(",")]
+            syndromes = responder.syndromes(block_ids)
+            socket.send(",".join([str(s) for s in syndromes]))
+
+        question = socket.recv()
+
+    return responder.leaked_bits
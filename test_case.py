@@ -1,7 +1,61 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+import base64
+import binascii
+from dataclasses import dataclass, field
+import hashlib
 import json
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
+
+
+@dataclass(frozen=True)
+class EncodedKey:
+    """
+    A key reported in the compact encoding. Keys are compared by their
+    length and hash, without decoding their bits.
+    """
+    length: int
+    sha256: str
+    data: str = field(compare=False, repr=False)
+
+    def __len__(self) -> int:
+        return self.length
+
+
+Key = Union[List[int], EncodedKey]
+
+
+def _encoded_key_hash(length: int, data: str) -> str:
+    """
+    Recomputes the hash of a key in the compact encoding from its bits, as
+    key_encoding.key_hash does: the SHA-256 hash of the key length followed
+    by the key bits, packed and padded with zeros to whole bytes.
+    """
+    try:
+        packed_key = bytearray(base64.b64decode(data, validate=True))
+    except binascii.Error:
+        raise ValueError("Encoded key data is not valid base64")
+
+    if length < 0 or len(packed_key) != -(-length // 8):
+        raise ValueError(f"Encoded key data does not hold {length} bits")
+
+    # Bits beyond the key length are not part of the key.
+    if length % 8:
+        packed_key[-1] &= (0xFF << (8 - length % 8)) & 0xFF
+
+    return hashlib.sha256(length.to_bytes(8, "big") + bytes(packed_key)).hexdigest()
+
+
+def parse_key(key: Optional[Union[List[int], Dict]]) -> Optional[Key]:
+    """
+    Parses a key reported by an application. Keys in the compact encoding
+    are compared by their hash, so the reported hash is checked against
+    the hash of the reported bits, raising a ValueError on a mismatch.
+    """
+    if isinstance(key, dict):
+        if _encoded_key_hash(key["length"], key["data"]) != key["sha256"]:
+            raise ValueError("Encoded key hash does not match its data")
+        return EncodedKey(key["length"], key["sha256"], key["data"])
+    return key
 
 
 class TestCase(ABC):
@@ -14,6 +68,8 @@ class TestCase(ABC):
     def __init__(self, name: str, key_length: int):
         self._name = name
         self._key_length = key_length
+        self.epr_pairs = 0
+        self.app_results: Optional[Dict] = None
 
     def configure(self) -> None:
         with open("experiment.json", "r") as f:
@@ -30,6 +86,15 @@ class TestCase(ABC):
         assert key_length_var["name"] == "key_length"
         key_length_var["value"] = self._key_length
 
+    def _configure_application_value(self, experiment: Dict, name: str, value) -> None:
+        for application_var in experiment["asset"]["application"]:
+            for value_var in application_var["values"]:
+                if value_var["name"] == name:
+                    value_var["value"] = value
+                    return
+
+        raise KeyError(f"Unknown application variable {name}")
+
     @abstractmethod
     def _configure_test_case(self, experiment: Dict) -> None:
         raise NotImplementedError
@@ -47,8 +112,14 @@ class TestCase(ABC):
             return False
 
         app_results = results[0]["round_result"][0]
-        alice_secret_key = app_results["app_alice"]["secret_key"]
-        bob_secret_key = app_results["app_bob"]["secret_key"]
+        self.app_results = app_results
+
+        try:
+            alice_secret_key = parse_key(app_results["app_alice"]["secret_key"])
+            bob_secret_key = parse_key(app_results["app_bob"]["secret_key"])
+        except ValueError as e:
+            self._print_result(TestCase.Result(success=False, message=str(e)), 0)
+            return False
 
         result = self._verify_test_case(alice_secret_key, bob_secret_key)
 
@@ -64,13 +135,14 @@ class TestCase(ABC):
             )
             epr_pairs = sum(1 for _ in entanglements)
 
+        self.epr_pairs = epr_pairs
         self._print_result(result, epr_pairs)
         return result.success
 
     def _verify_key_match(
             self,
-            alice_secret_key: Optional[List[int]],
-            bob_secret_key: Optional[List[int]]
+            alice_secret_key: Optional[Key],
+            bob_secret_key: Optional[Key]
     ) -> Result:
         if (alice_secret_key is not None) and (len(alice_secret_key) != self._key_length):
             return TestCase.Result(
@@ -90,8 +162,8 @@ class TestCase(ABC):
     @abstractmethod
     def _verify_test_case(
             self,
-            alice_secret_key: Optional[List[int]],
-            bob_secret_key: Optional[List[int]]
+            alice_secret_key: Optional[Key],
+            bob_secret_key: Optional[Key]
     ) -> Result:
         raise NotImplementedError
 